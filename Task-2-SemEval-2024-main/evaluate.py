@@ -5,106 +5,171 @@ import os
 import os.path
 import sys
 import warnings
-from sklearn.metrics import f1_score, precision_score, recall_score
+import numpy as np
 
 warnings.simplefilter('ignore')
 
-def extract_control_set(predictions, gold):
-    control_predicitons = {}
-    for key in gold.keys():
-        if "Causal_type" not in gold[key].keys():
-            control_predicitons[key] = predictions[key]
-    return control_predicitons
-
-
-def extract_by_intervention(predictions, gold):
-    para_predictions = {}
-    cont_predictions = {}
-    numerical_para_predictions = {}
-    numerical_cont_predictions = {}
-    definitions_predictions = {}
-    for key in predictions.keys():
-        if "Intervention" not in gold[key].keys():
-            continue
-        if gold[key]["Intervention"] == "Paraphrase":
-            para_predictions[key] = predictions[key]
-        elif gold[key]["Intervention"] == "Contradiction":
-            cont_predictions[key] = predictions[key]
-        elif gold[key]["Intervention"] == "Numerical_paraphrase":
-            numerical_para_predictions[key] = predictions[key]
-        elif gold[key]["Intervention"] == "Numerical_contradiction":
-            numerical_cont_predictions[key] = predictions[key]
-        elif gold[key]["Intervention"] == "Text_appended":
-            definitions_predictions[key] = predictions[key]
-    print("Number of contradiction samples:", len(cont_predictions))
-    return para_predictions, cont_predictions, numerical_para_predictions, numerical_cont_predictions, definitions_predictions
-
-
-def extract_by_causal_type(predictions, gold):
-    predictions_preserving = {}
-    predictions_altering = {}
-    for key in predictions.keys():
-        if "Causal_type" not in gold[key].keys():
-            continue
-        if gold[key]["Causal_type"][0] == "Preserving":
-            predictions_preserving[key] = predictions[key]
-        elif gold[key]["Causal_type"][0] == "Altering":
-            predictions_altering[key] = predictions[key]
-    return predictions_preserving, predictions_altering
-
-
-def faithfulness(predictions, gold):
-    uuid_list = list(predictions.keys())
-    N = len(uuid_list)
-    results = []
-    for key in uuid_list:
-        if predictions[key]["Prediction"] != gold[gold[key]["Causal_type"][1]]["Label"]:
-            results.append(1)
-        else:
-            results.append(0)
-    Faithfulness = sum(results) / N
-    return Faithfulness
-
-
-def consistency(predictions_preserving, predictions, gold):
-    uuid_list = list(predictions_preserving.keys())
-    N = len(uuid_list)
-    results = []
-    for key in uuid_list:
-        if predictions_preserving[key]["Prediction"] == predictions[gold[key]["Causal_type"][1]]["Prediction"]:
-            results.append(1)
-        else:
-            results.append(0)
-    Consistency = sum(results) / N
-    return Consistency
-
-
-def extract_contrast_set(predictions, gold):
-    contrast_predicitons = {}
-    for key in predictions.keys():
-        if "Causal_type" in gold[key].keys():
-            contrast_predicitons[key] = predictions[key]
-    return contrast_predicitons
-
-
-def F1_Recall_Precision(predictions, gold):
-    pred_labels = []
-    gold_labels = []
-    for key in predictions.keys():
-        if predictions[key]["Prediction"] == "Entailment":
-            pred_labels.append(1)
-        else:
-            pred_labels.append(0)
-        if gold[key]["Label"] == "Entailment":
-            gold_labels.append(1)
-        else:
-            gold_labels.append(0)
-    F1 = f1_score(gold_labels, pred_labels)
-    Recall = recall_score(gold_labels, pred_labels)
-    Precision = precision_score(gold_labels, pred_labels)  
+# Intervention types in gold_test.json, encoded as their index in this list
+INTERVENTIONS = ["Paraphrase", "Contradiction", "Numerical_paraphrase", "Numerical_contradiction", "Text_appended"]
+
+# Causal type codes; control instances have no Causal_type
+CONTROL, PRESERVING, ALTERING = 0, 1, 2
+
+
+def encode(predictions, gold):
+    """Build aligned NumPy arrays over the gold instances in a single pass.
+
+    Labels and predictions share one integer coding, so comparing codes is the
+    same as comparing the original strings. pair holds the position of the
+    instance named in Causal_type[1], or -1 for control instances.
+    """
+    uuids = list(gold.keys())
+    position = {key: i for i, key in enumerate(uuids)}
+    codes = {}
+    n = len(uuids)
+
+    gold_code = np.empty(n, dtype=np.int64)
+    pred_code = np.full(n, -1, dtype=np.int64)
+    has_pred = np.zeros(n, dtype=bool)
+    intervention = np.full(n, -1, dtype=np.int8)
+    causal_type = np.full(n, CONTROL, dtype=np.int8)
+    pair = np.full(n, -1, dtype=np.int64)
+
+    for i, key in enumerate(uuids):
+        instance = gold[key]
+        gold_code[i] = codes.setdefault(instance["Label"], len(codes))
+        if key in predictions:
+            has_pred[i] = True
+            pred_code[i] = codes.setdefault(predictions[key]["Prediction"], len(codes))
+        if instance.get("Intervention") in INTERVENTIONS:
+            intervention[i] = INTERVENTIONS.index(instance["Intervention"])
+        if "Causal_type" in instance:
+            causal_type[i] = {"Preserving": PRESERVING, "Altering": ALTERING}.get(instance["Causal_type"][0], -1)
+            pair[i] = position[instance["Causal_type"][1]]
+
+    entailment = codes.get("Entailment", -2)
+    return {
+        "gold_code": gold_code,
+        "pred_code": pred_code,
+        "gold_entailment": gold_code == entailment,
+        "pred_entailment": pred_code == entailment,
+        "has_pred": has_pred,
+        "intervention": intervention,
+        "causal_type": causal_type,
+        "pair": pair,
+    }
+
+
+def faithfulness(arrays, mask):
+    # Share of altering instances whose prediction differs from the gold label of the original statement
+    pair = arrays["pair"][mask]
+    results = arrays["pred_code"][mask] != arrays["gold_code"][pair]
+    return results.sum() / results.size
+
+
+def consistency(arrays, mask):
+    # Share of preserving instances predicted the same way as the original statement
+    pair = arrays["pair"][mask]
+    results = arrays["pred_code"][mask] == arrays["pred_code"][pair]
+    return results.sum() / results.size
+
+
+def _divide(numerator, denominator):
+    # Same convention as sklearn's zero_division default: an undefined score counts as 0
+    return float(numerator / denominator) if denominator else 0.0
+
+
+def F1_Recall_Precision(arrays, mask):
+    pred = arrays["pred_entailment"][mask]
+    gold = arrays["gold_entailment"][mask]
+    tp = np.count_nonzero(pred & gold)
+    fp = np.count_nonzero(pred & ~gold)
+    fn = np.count_nonzero(~pred & gold)
+    F1 = _divide(2 * tp, 2 * tp + fp + fn)
+    Recall = _divide(tp, tp + fn)
+    Precision = _divide(tp, tp + fp)
     return F1, Recall, Precision
 
 
+def score(predictions, gold):
+    """Return every metric, in scores.txt order, for one set of predictions."""
+    arrays = encode(predictions, gold)
+    has_pred = arrays["has_pred"]
+    causal_type = arrays["causal_type"]
+    preserving = causal_type == PRESERVING
+    altering = causal_type == ALTERING
+    para, cont, numerical_para, numerical_cont, definitions = (
+        has_pred & (arrays["intervention"] == i) for i in range(len(INTERVENTIONS))
+    )
+    print("Number of contradiction samples:", np.count_nonzero(cont))
+
+
+    # Control Test Set F1, Recall, Precision PUBLIC
+    Control_F1, Control_Rec, Control_Prec = F1_Recall_Precision(arrays, has_pred & (causal_type == CONTROL))
+
+
+    # Contrast Consistency & Faithfullness PUBLIC
+    contrast = has_pred & (causal_type != CONTROL)
+    Faithfulness = faithfulness(arrays, contrast & altering)
+    Consistency = consistency(arrays, contrast & preserving)
+
+
+    # Intervention-wise Consistency & Faithfullness HIDDEN
+    para_Consistency = consistency(arrays, para & preserving)
+    cont_Faithfulness = faithfulness(arrays, cont & altering)
+    cont_Consistency = consistency(arrays, cont & preserving)
+    numerical_para_Consistency = consistency(arrays, numerical_para & preserving)
+    numerical_cont_Faithfulness = faithfulness(arrays, numerical_cont & altering)
+    numerical_cont_Consistency = consistency(arrays, numerical_cont & preserving)
+    definitions_Consistency = consistency(arrays, definitions & preserving)
+
+
+    # Intervention-wise F1, Recall, Precision HIDDEN
+    Contrast_F1, Contrast_Rec, Contrast_Prec = F1_Recall_Precision(arrays, contrast)
+    para_F1, para_Rec, para_Prec = F1_Recall_Precision(arrays, para)
+    cont_F1, cont_Rec, cont_Prec = F1_Recall_Precision(arrays, cont)
+    numerical_para_F1, numerical_para_Rec, numerical_para_Prec = F1_Recall_Precision(arrays, numerical_para)
+    numerical_cont_F1, numerical_cont_Rec, numerical_cont_Prec = F1_Recall_Precision(arrays, numerical_cont)
+    definitions_F1, definitions_Rec, definitions_Prec = F1_Recall_Precision(arrays, definitions)
+
+    return {
+        'Control_F1': Control_F1,
+        'Control_Recall': Control_Rec,
+        'Control_Precision': Control_Prec,
+        'Contrast_F1': Contrast_F1,
+        'Contrast_Recall': Contrast_Rec,
+        'Contrast_Precision': Contrast_Prec,
+        'Faithfulness': Faithfulness,
+        'Consistency': Consistency,
+        'Para_Consistency': para_Consistency,
+        'Cont_Faithfulness': cont_Faithfulness,
+        'Cont_Consistency': cont_Consistency,
+        'Numerical_Para_Consistency': numerical_para_Consistency,
+        'Numerical_Cont_Faithfulness': numerical_cont_Faithfulness,
+        'Numerical_Cont_Consistency': numerical_cont_Consistency,
+        'Definitions_Consistency': definitions_Consistency,
+        'Para_F1': para_F1,
+        'Para_Recall': para_Rec,
+        'Para_Precision': para_Prec,
+        'Cont_F1': cont_F1,
+        'Cont_Recall': cont_Rec,
+        'Cont_Precision': cont_Prec,
+        'Numerical_Para_F1': numerical_para_F1,
+        'Numerical_Para_Recall': numerical_para_Rec,
+        'Numerical_Para_Precision': numerical_para_Prec,
+        'Numerical_Cont_F1': numerical_cont_F1,
+        'Numerical_Cont_Recall': numerical_cont_Rec,
+        'Numerical_Cont_Precision': numerical_cont_Prec,
+        'Definitions_F1': definitions_F1,
+        'Definitions_Recall': definitions_Rec,
+        'Definitions_Precision': definitions_Prec,
+    }
+
+
+def write_scores(scores, output_filename):
+    with open(output_filename, 'w') as f:
+        for name, value in scores.items():
+            print(name + ': ', value, file=f)
 
 
 def main():
@@ -133,80 +198,8 @@ def main():
     with open(gold_filename) as json_file:
         gold = json.load(json_file)
 
-    
-
-
-
-    # Control Test Set F1, Recall, Precision PUBLIC
-    Control_F1, Control_Rec, Control_Prec = F1_Recall_Precision(extract_control_set(predictions, gold), gold)
-
-
-    # Contrast Consistency & Faithfullness PUBLIC
-    contrast_predictions = extract_contrast_set(predictions, gold)
-    predictions_preserving, predictions_altering = extract_by_causal_type(contrast_predictions, gold)
-    Faithfulness = faithfulness(predictions_altering, gold)
-    Consistency = consistency(predictions_preserving, predictions, gold)
-
-
-    # Intervention-wise Consistency & Faithfullness HIDDEN
-    para_predictions, cont_predictions, numerical_para_predictions, numerical_cont_predictions, definitions_predictions = \
-        extract_by_intervention(predictions, gold)
-    para_preserving = extract_by_causal_type(para_predictions, gold)[0]
-    cont_preserving, cont_altering = extract_by_causal_type(cont_predictions, gold)
-    numerical_para_preserving = extract_by_causal_type(numerical_para_predictions, gold)[0]
-    numerical_cont_preserving, numerical_cont_altering = extract_by_causal_type(numerical_cont_predictions, gold)
-    definitions_preserving = extract_by_causal_type(definitions_predictions, gold)[0]
-    para_Consistency = consistency(para_preserving, predictions, gold)
-    cont_Faithfulness = faithfulness(cont_altering, gold)
-    cont_Consistency = consistency(cont_preserving, predictions, gold)
-    numerical_para_Consistency = consistency(numerical_para_preserving, predictions, gold)
-    numerical_cont_Faithfulness = faithfulness(numerical_cont_altering, gold)
-    numerical_cont_Consistency = consistency(numerical_cont_preserving, predictions, gold)
-    definitions_Consistency = consistency(definitions_preserving, predictions, gold)
-
-
-    # Intervention-wise F1, Recall, Precision HIDDEN
-    Contrast_F1, Contrast_Rec, Contrast_Prec = F1_Recall_Precision(contrast_predictions, gold)
-    para_F1, para_Rec, para_Prec = F1_Recall_Precision(para_predictions, gold)
-    cont_F1, cont_Rec, cont_Prec = F1_Recall_Precision(cont_predictions, gold)
-    numerical_para_F1, numerical_para_Rec, numerical_para_Prec = F1_Recall_Precision(numerical_para_predictions, gold)
-    numerical_cont_F1, numerical_cont_Rec, numerical_cont_Prec = F1_Recall_Precision(numerical_cont_predictions, gold)
-    definitions_F1, definitions_Rec, definitions_Prec = F1_Recall_Precision(definitions_predictions, gold)
-
     # Output results
-
-    output_filename = os.path.join(output_dir, 'scores.txt')
-    with open(output_filename, 'w') as f:
-        print('Control_F1: ', Control_F1, file=f)
-        print('Control_Recall: ', Control_Rec, file=f)
-        print('Control_Precision: ', Control_Prec, file=f)
-        print('Contrast_F1: ', Contrast_F1, file=f)
-        print('Contrast_Recall: ', Contrast_Rec, file=f)
-        print('Contrast_Precision: ', Contrast_Prec, file=f)
-        print('Faithfulness: ', Faithfulness, file=f)
-        print('Consistency: ', Consistency, file=f)
-        print('Para_Consistency: ', para_Consistency, file=f)
-        print('Cont_Faithfulness: ', cont_Faithfulness, file=f)
-        print('Cont_Consistency: ', cont_Consistency, file=f)
-        print('Numerical_Para_Consistency: ', numerical_para_Consistency, file=f)
-        print('Numerical_Cont_Faithfulness: ', numerical_cont_Faithfulness, file=f)
-        print('Numerical_Cont_Consistency: ', numerical_cont_Consistency, file=f)
-        print('Definitions_Consistency: ', definitions_Consistency, file=f)
-        print('Para_F1: ', para_F1, file=f)
-        print('Para_Recall: ', para_Rec, file=f)
-        print('Para_Precision: ', para_Prec, file=f)
-        print('Cont_F1: ', cont_F1, file=f)
-        print('Cont_Recall: ', cont_Rec, file=f)
-        print('Cont_Precision: ', cont_Prec, file=f)
-        print('Numerical_Para_F1: ', numerical_para_F1, file=f)
-        print('Numerical_Para_Recall: ', numerical_para_Rec, file=f)
-        print('Numerical_Para_Precision: ', numerical_para_Prec, file=f)
-        print('Numerical_Cont_F1: ', numerical_cont_F1, file=f)
-        print('Numerical_Cont_Recall: ', numerical_cont_Rec, file=f)
-        print('Numerical_Cont_Precision: ', numerical_cont_Prec, file=f)
-        print('Definitions_F1: ', definitions_F1, file=f)
-        print('Definitions_Recall: ', definitions_Rec, file=f)
-        print('Definitions_Precision: ', definitions_Prec, file=f)
+    write_scores(score(predictions, gold), os.path.join(output_dir, 'scores.txt'))
 
 
 if '__main__' == __name__:
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+
+import os
+import os.path
+import sys
+import glob
+import json
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+from evaluate import score, write_scores
+
+warnings.simplefilter('ignore')
+
+# Columns shown in the leaderboard, in order; every metric still goes to scores_<run>.txt
+LEADERBOARD_COLUMNS = ['Control_F1', 'Contrast_F1', 'Faithfulness', 'Consistency', 'Control_Precision', 'Control_Recall']
+
+_gold = None
+
+
+def _init_worker(gold):
+    global _gold
+    _gold = gold
+
+
+def score_file(pred_filename):
+    with open(pred_filename) as json_file:
+        predictions = json.load(json_file)
+    return score(predictions, _gold)
+
+
+def run_name(pred_filename):
+    name = os.path.splitext(os.path.basename(pred_filename))[0]
+    return name[len('predictions_'):] if name.startswith('predictions_') else name
+
+
+def write_leaderboard(rows, output_dir):
+    header = ['Run'] + LEADERBOARD_COLUMNS
+    with open(os.path.join(output_dir, 'leaderboard.csv'), 'w') as f:
+        print(','.join(header), file=f)
+        for name, scores in rows:
+            print(','.join([name] + ['{:.4f}'.format(scores[c]) for c in LEADERBOARD_COLUMNS]), file=f)
+
+    with open(os.path.join(output_dir, 'leaderboard.md'), 'w') as f:
+        print('| ' + ' | '.join(header) + ' |', file=f)
+        print('|' + '---|' * len(header), file=f)
+        for name, scores in rows:
+            print('| ' + ' | '.join([name] + ['{:.4f}'.format(scores[c]) for c in LEADERBOARD_COLUMNS]) + ' |', file=f)
+
+
+def main():
+    """Score every res/predictions_*.json against ref/gold_test.json in one process pool.
+
+    Usage: python evaluate_all.py <input_dir> <output_dir> [workers]
+    Writes output_dir/scores_<run>.txt per file plus leaderboard.csv and
+    leaderboard.md sorted by Control_F1.
+    """
+    input_dir = sys.argv[1]
+    output_dir = sys.argv[2]
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else None
+    pred_dir = os.path.join(input_dir, 'res')
+    gold_dir = os.path.join(input_dir, 'ref')
+
+    if not os.path.isdir(pred_dir):
+        raise RuntimeError('{} does not exist'.format(pred_dir))
+
+    if not os.path.isdir(gold_dir):
+        raise RuntimeError('{} does not exist'.format(gold_dir))
+
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+
+    pred_filenames = sorted(glob.glob(os.path.join(pred_dir, 'predictions_*.json')))
+    if not pred_filenames:
+        raise RuntimeError('no predictions_*.json files in {}'.format(pred_dir))
+
+    # Gold is parsed once here and handed to each worker when the pool starts
+    with open(os.path.join(gold_dir, 'gold_test.json')) as json_file:
+        gold = json.load(json_file)
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(gold,)) as executor:
+        all_scores = list(executor.map(score_file, pred_filenames))
+
+    rows = []
+    for pred_filename, scores in zip(pred_filenames, all_scores):
+        name = run_name(pred_filename)
+        write_scores(scores, os.path.join(output_dir, 'scores_{}.txt'.format(name)))
+        rows.append((name, scores))
+
+    rows.sort(key=lambda row: row[1]['Control_F1'], reverse=True)
+    write_leaderboard(rows, output_dir)
+    print('Scored {} prediction files, leaderboard written to {}'.format(len(rows), output_dir))
+
+
+if '__main__' == __name__:
+    main()
@@ -0,0 +1,134 @@
+import os
+import time
+import threading
+
+from retry_policy import status_code
+
+
+# ADAPTIVE_CONCURRENCY=0 关闭自适应并发，只由 MAX_WORKERS 决定同时发出的请求数
+ADAPTIVE_CONCURRENCY = os.getenv("ADAPTIVE_CONCURRENCY", "1") != "0"
+
+# Starting and largest number of requests in flight per provider/model
+ADAPTIVE_START = float(os.getenv("ADAPTIVE_START", "4"))
+ADAPTIVE_MAX = int(os.getenv("ADAPTIVE_MAX", "64"))
+
+# Multiplicative cut on overload, and how much slower than the running average
+# latency a request must be to count as a spike
+ADAPTIVE_BACKOFF = float(os.getenv("ADAPTIVE_BACKOFF", "0.5"))
+ADAPTIVE_LATENCY_FACTOR = float(os.getenv("ADAPTIVE_LATENCY_FACTOR", "3"))
+
+# Fixed cost of a request (network, prompt processing) counted as this many output
+# tokens, so a one-token classification and a 1024-token review have comparable pace
+ADAPTIVE_OVERHEAD_TOKENS = float(os.getenv("ADAPTIVE_OVERHEAD_TOKENS", "100"))
+
+OVERLOAD_STATUS = {429, 503, 529}
+
+# Successful requests seen before latency spikes are judged, and the weight of each new sample in the averages
+LATENCY_WARMUP = 10
+LATENCY_ALPHA = 0.1
+
+
+def _ewma(average, value):
+    return value if average is None else (1 - LATENCY_ALPHA) * average + LATENCY_ALPHA * value
+
+
+class AIMDLimiter:
+    """Additive-increase / multiplicative-decrease cap on concurrent requests.
+
+    Each success adds 1/limit, so the limit grows by about one per round of
+    requests while latency stays near its running average. A 429/503/529, a
+    timeout or a request slower than ADAPTIVE_LATENCY_FACTOR x the average
+    multiplies the limit by ADAPTIVE_BACKOFF, at most once per average latency
+    so that one burst of errors from requests already in flight counts once.
+
+    Latency is compared as pace, seconds per (output tokens +
+    ADAPTIVE_OVERHEAD_TOKENS), so short and long generations on the same
+    model share one baseline without long ones counting as spikes.
+    """
+
+    def __init__(self, start=ADAPTIVE_START, max_limit=ADAPTIVE_MAX, min_limit=1):
+        self.limit = float(min(max(start, min_limit), max_limit))
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.in_flight = 0
+        self.latency = None
+        self.pace = None
+        self.successes = 0
+        self.last_decrease = 0.0
+        self.condition = threading.Condition()
+
+    def _decrease(self):
+        now = time.monotonic()
+        if now - self.last_decrease < (self.latency or 1.0):
+            return
+        self.limit = max(self.min_limit, self.limit * ADAPTIVE_BACKOFF)
+        self.last_decrease = now
+
+    def on_success(self, latency, output_tokens=None):
+        pace = latency / ((output_tokens or 0) + ADAPTIVE_OVERHEAD_TOKENS)
+        with self.condition:
+            if self.successes >= LATENCY_WARMUP and pace > ADAPTIVE_LATENCY_FACTOR * self.pace:
+                self._decrease()
+            else:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self.latency = _ewma(self.latency, latency)
+            self.pace = _ewma(self.pace, pace)
+            self.successes += 1
+            self.condition.notify_all()
+
+    def on_overload(self):
+        with self.condition:
+            self._decrease()
+
+    def run(self, call):
+        """Return call() once a slot under the current limit is free, feeding its outcome back.
+
+        call() returns a tuple whose last item is the number of output tokens (or None).
+        """
+        with self.condition:
+            while self.in_flight >= int(self.limit):
+                self.condition.wait()
+            self.in_flight += 1
+
+        start = time.monotonic()
+        try:
+            result = call()
+        except Exception as e:
+            if status_code(e) in OVERLOAD_STATUS or "Timeout" in type(e).__name__:
+                self.on_overload()
+            raise
+        finally:
+            with self.condition:
+                self.in_flight -= 1
+                self.condition.notify_all()
+        self.on_success(time.monotonic() - start, result[-1])
+        return result
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_concurrency_limiter(provider, model):
+    """Return the AIMD limiter for this provider/model, or None when ADAPTIVE_CONCURRENCY=0."""
+    if not ADAPTIVE_CONCURRENCY:
+        return None
+    key = (provider, model)
+    with _limiters_lock:
+        if key not in _limiters:
+            _limiters[key] = AIMDLimiter()
+        return _limiters[key]
+
+
+def run_limited(provider, model, call):
+    limiter = get_concurrency_limiter(provider, model)
+    return limiter.run(call) if limiter else call()
+
+
+def concurrency_status():
+    """Return the current concurrency limit of every model in use, e.g. "llama-3.3-70b-versatile 12", or None."""
+    with _limiters_lock:
+        items = list(_limiters.items())
+    if not items:
+        return None
+    return ", ".join(f"{model} {int(limiter.limit)}" for (provider, model), limiter in items)
@@ -0,0 +1,136 @@
+import os
+import io
+import json
+import time
+
+from engine import load_existing_results
+from llm_client import content_text
+from result_writer import write_json_atomic
+
+
+# How often to poll the provider for batch status, in seconds
+POLL_INTERVAL = float(os.getenv("BATCH_POLL_INTERVAL", "30"))
+
+OPENAI_DONE = ("completed", "failed", "expired", "cancelled")
+
+
+def build_batch_requests(test_data, create_prompt, provider, model, max_tokens=None, temperature=0, **kwargs):
+    """Return one provider batch request per sample, using the sample_id as custom_id.
+
+    The bodies match what llm_client.chat_completion sends for the same
+    arguments: max_tokens is left out for OpenAI-compatible APIs when None and
+    defaults to 1024 for Anthropic, which requires it.
+    """
+    requests = []
+    for sample_id, sample_data in test_data.items():
+        content = create_prompt(sample_id, sample_data)
+        if provider != "anthropic":
+            content = content_text(content)
+        messages = [{"role": "user", "content": content}]
+        body = {"model": model, "messages": messages, "temperature": temperature, **kwargs}
+        if provider == "anthropic" or max_tokens is not None:
+            body["max_tokens"] = max_tokens or 1024
+        if provider == "anthropic":
+            requests.append({"custom_id": sample_id, "params": body})
+        else:
+            requests.append({"custom_id": sample_id, "method": "POST", "url": "/v1/chat/completions", "body": body})
+    return requests
+
+
+def submit_batch(client, provider, requests):
+    if provider == "anthropic":
+        return client.messages.batches.create(requests=requests).id
+
+    jsonl = "".join(json.dumps(request, ensure_ascii=False) + "\n" for request in requests)
+    batch_file = client.files.create(file=("batch.jsonl", io.BytesIO(jsonl.encode('utf-8'))), purpose="batch")
+    batch = client.batches.create(
+        input_file_id=batch_file.id,
+        endpoint="/v1/chat/completions",
+        completion_window="24h"
+    )
+    return batch.id
+
+
+def wait_for_batch(client, provider, batch_id, poll_interval=POLL_INTERVAL):
+    """Poll until the batch has finished and return the final batch object."""
+    while True:
+        if provider == "anthropic":
+            batch = client.messages.batches.retrieve(batch_id)
+            done = batch.processing_status == "ended"
+            status = f"{batch.processing_status} {batch.request_counts}"
+        else:
+            batch = client.batches.retrieve(batch_id)
+            done = batch.status in OPENAI_DONE
+            status = f"{batch.status} {batch.request_counts}"
+        print(f"Batch {batch_id}: {status}")
+        if done:
+            return batch
+        time.sleep(poll_interval)
+
+
+def fetch_batch_outputs(client, provider, batch):
+    """Return {custom_id: (completion text, error)}; exactly one of the two is None."""
+    outputs = {}
+    if provider == "anthropic":
+        for entry in client.messages.batches.results(batch.id):
+            if entry.result.type == "succeeded":
+                outputs[entry.custom_id] = (entry.result.message.content[0].text, None)
+            else:
+                outputs[entry.custom_id] = (None, entry.result.type)
+        return outputs
+
+    for file_id in (batch.output_file_id, batch.error_file_id):
+        if not file_id:
+            continue
+        for line in client.files.content(file_id).text.splitlines():
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            response = record.get("response") or {}
+            if response.get("status_code") == 200:
+                outputs[record["custom_id"]] = (response["body"]["choices"][0]["message"]["content"], None)
+            else:
+                outputs[record["custom_id"]] = (None, str(record.get("error") or response.get("body")))
+    return outputs
+
+
+def run_batch(client, provider, model, test_data, create_prompt, extract_prediction, results_file,
+              max_tokens=None, temperature=0, keep_output=False, **kwargs):
+    """Run every pending sample through the provider's batch API and save the predictions.
+
+    extract_prediction maps the completion text to "Entailment", "Contradiction"
+    or "NAN"; with keep_output the text is also stored as Model_Output. The batch id is kept in <results_file>.batch until the results are
+    saved, so rerunning after an interruption resumes polling instead of
+    submitting the batch again.
+    """
+    results = load_existing_results(results_file)
+    pending = {sample_id: sample_data for sample_id, sample_data in test_data.items() if sample_id not in results}
+    batch_id_file = f"{results_file}.batch"
+
+    if os.path.exists(batch_id_file):
+        with open(batch_id_file, 'r', encoding='utf-8') as f:
+            batch_id = f.read().strip()
+        print(f"Resuming batch {batch_id}")
+    elif pending:
+        requests = build_batch_requests(pending, create_prompt, provider, model, max_tokens, temperature, **kwargs)
+        batch_id = submit_batch(client, provider, requests)
+        with open(batch_id_file, 'w', encoding='utf-8') as f:
+            f.write(batch_id)
+        print(f"Submitted batch {batch_id} with {len(requests)} requests")
+    else:
+        print("All samples already have predictions")
+        return results
+
+    batch = wait_for_batch(client, provider, batch_id)
+    for sample_id, (text, error) in fetch_batch_outputs(client, provider, batch).items():
+        if error is not None:
+            results[sample_id] = {"Prediction": "NAN", "Status": "error", "Error": error}
+        else:
+            results[sample_id] = {"Prediction": extract_prediction(text.strip())}
+            if keep_output:
+                results[sample_id]["Model_Output"] = text.strip()
+
+    ordered = {sample_id: results[sample_id] for sample_id in test_data if sample_id in results}
+    write_json_atomic(ordered, results_file)
+    os.remove(batch_id_file)
+    return ordered
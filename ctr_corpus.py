@@ -0,0 +1,182 @@
+import os
+import sys
+import json
+import mmap
+import struct
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+
+DEFAULT_CT_DIR = Path(__file__).parent / "Task-2-SemEval-2024-main" / "training_data" / "CT json"
+
+# Packed corpus layout: magic, entry count, then one index record per
+# (trial id, section) holding the key and the payload's offset/length, followed
+# by the UTF-8 JSON payloads themselves. An empty section name marks a trial
+# with no sections so that known-but-empty trials are told apart from missing ones.
+PACK_MAGIC = b"CTRPACK1"
+_COUNT = struct.Struct("<I")
+_KEY_LEN = struct.Struct("<H")
+_LOCATION = struct.Struct("<QI")
+
+
+class CTRCorpus:
+    """Clinical trial reports loaded from the CT json directory, parsed once per trial.
+
+    Trials are memoized on first use; with max_trials set, the least recently
+    used trials are dropped once more than max_trials are held in memory.
+    """
+
+    def __init__(self, directory=DEFAULT_CT_DIR, max_trials=None):
+        self.directory = Path(directory)
+        self.max_trials = max_trials
+        self.trials = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_trial(self, trial_id):
+        with self.lock:
+            if trial_id in self.trials:
+                self.hits += 1
+                self.trials.move_to_end(trial_id)
+                return self.trials[trial_id]
+            self.misses += 1
+
+        trial_path = self.directory / f"{trial_id}.json"
+        if not trial_path.exists():
+            trial_data = None
+        else:
+            with open(trial_path, 'r', encoding='utf-8') as f:
+                trial_data = json.load(f)
+
+        with self.lock:
+            self.trials[trial_id] = trial_data
+            if self.max_trials is not None and len(self.trials) > self.max_trials:
+                self.trials.popitem(last=False)
+        return trial_data
+
+    def get_section(self, trial_id, section_id):
+        trial_data = self.get_trial(trial_id)
+        if trial_data is None:
+            return None
+        return trial_data.get(section_id, "")
+
+
+def build_packed_corpus(directory, pack_file):
+    """Pack every NCTxxxx.json in directory into a single indexed file at pack_file."""
+    entries = []
+    for trial_path in sorted(Path(directory).glob("*.json")):
+        with open(trial_path, 'r', encoding='utf-8') as f:
+            trial_data = json.load(f)
+        sections = [(trial_path.stem, section_id, json.dumps(value, ensure_ascii=False).encode('utf-8'))
+                    for section_id, value in trial_data.items()]
+        entries.extend(sections or [(trial_path.stem, None, b"")])
+
+    keys = [f"{trial_id}\x00{section_id or ''}".encode('utf-8') for trial_id, section_id, _ in entries]
+    index_size = _COUNT.size + sum(_KEY_LEN.size + len(key) + _LOCATION.size for key in keys)
+    offset = len(PACK_MAGIC) + index_size
+
+    tmp_file = f"{pack_file}.tmp"
+    with open(tmp_file, 'wb') as f:
+        f.write(PACK_MAGIC)
+        f.write(_COUNT.pack(len(entries)))
+        for key, (_, _, payload) in zip(keys, entries):
+            f.write(_KEY_LEN.pack(len(key)))
+            f.write(key)
+            f.write(_LOCATION.pack(offset, len(payload)))
+            offset += len(payload)
+        for _, _, payload in entries:
+            f.write(payload)
+    os.replace(tmp_file, pack_file)
+    return len(entries)
+
+
+class PackedCTRCorpus:
+    """Read-only view of a packed corpus file built by build_packed_corpus.
+
+    The file is memory-mapped, so worker processes opened on the same file share
+    its page-cache pages; only the small offset table is held per process.
+    """
+
+    def __init__(self, pack_file):
+        self.f = open(pack_file, 'rb')
+        self.mm = mmap.mmap(self.f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.mm[:len(PACK_MAGIC)] != PACK_MAGIC:
+            raise ValueError(f"{pack_file} is not a packed CTR corpus")
+
+        self.index = {}
+        self.trial_ids = set()
+        pos = len(PACK_MAGIC)
+        (count,) = _COUNT.unpack_from(self.mm, pos)
+        pos += _COUNT.size
+        for _ in range(count):
+            (key_len,) = _KEY_LEN.unpack_from(self.mm, pos)
+            pos += _KEY_LEN.size
+            trial_id, section_id = self.mm[pos:pos + key_len].decode('utf-8').split("\x00")
+            pos += key_len
+            if section_id:
+                self.index[(trial_id, section_id)] = _LOCATION.unpack_from(self.mm, pos)
+            self.trial_ids.add(trial_id)
+            pos += _LOCATION.size
+
+    def get_section(self, trial_id, section_id):
+        """Return the parsed section, or "" / None like CTRCorpus.get_section.
+
+        Not zero-copy: the section's bytes are copied out of the map and parsed
+        on every call. Only that one section is read, and the mapped pages stay
+        shared between processes.
+        """
+        location = self.index.get((trial_id, section_id))
+        if location is None:
+            return "" if trial_id in self.trial_ids else None
+        offset, length = location
+        return json.loads(self.mm[offset:offset + length])
+
+    def close(self):
+        self.mm.close()
+        self.f.close()
+
+
+_corpus = None
+_corpus_lock = threading.Lock()
+
+
+def get_corpus():
+    """Return the process-wide corpus.
+
+    CT_PACK_FILE in .env selects a packed corpus file; otherwise the CT json
+    directory (CT_JSON_DIR) is parsed lazily, capped by CTR_CACHE_MAX_TRIALS.
+    """
+    global _corpus
+    with _corpus_lock:
+        if _corpus is None and os.getenv("CT_PACK_FILE"):
+            _corpus = PackedCTRCorpus(os.getenv("CT_PACK_FILE"))
+        if _corpus is None:
+            max_trials = os.getenv("CTR_CACHE_MAX_TRIALS")
+            _corpus = CTRCorpus(
+                os.getenv("CT_JSON_DIR") or DEFAULT_CT_DIR,
+                max_trials=int(max_trials) if max_trials else None
+            )
+        return _corpus
+
+
+def corpus_cache_summary():
+    """Return a one-line hit ratio for the in-memory trial cache, or None if it was not used."""
+    corpus = _corpus
+    if not isinstance(corpus, CTRCorpus) or corpus.hits + corpus.misses == 0:
+        return None
+    lookups = corpus.hits + corpus.misses
+    return f"Trial cache: {corpus.hits}/{lookups} lookups served from memory ({corpus.hits / lookups:.1%})"
+
+
+def get_section_content(trial_id, section_id):
+    return get_corpus().get_section(trial_id, section_id)
+
+
+if __name__ == "__main__":
+    # Usage: python ctr_corpus.py <CT json directory> <pack file>
+    ct_dir = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_CT_DIR
+    pack_file = sys.argv[2] if len(sys.argv) > 2 else "ctr_corpus.pack"
+    count = build_packed_corpus(ct_dir, pack_file)
+    print(f"Packed {count} sections from {ct_dir} into {pack_file}")
@@ -0,0 +1,287 @@
+import os
+import json
+import time
+import asyncio
+from pathlib import Path
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dotenv import load_dotenv
+
+# 先加载 .env：下面这些模块在 import 时读取配置，之后再加载就不生效了
+load_dotenv()
+
+from result_writer import JsonlResultWriter, read_jsonl_results, compact_results
+from llm_client import prompt_cache_summary
+from ctr_corpus import corpus_cache_summary
+from retry_policy import status_code
+from key_pool import key_pool_summary
+from adaptive_concurrency import ADAPTIVE_CONCURRENCY, ADAPTIVE_MAX, concurrency_status
+
+
+# Number of samples kept in flight at once, read from .env (loaded above). With adaptive
+# concurrency the per-model AIMD limit decides how many requests are actually sent,
+# so the workers only need to be enough to reach ADAPTIVE_MAX
+DEFAULT_MAX_WORKERS = int(os.getenv("MAX_WORKERS", str(ADAPTIVE_MAX) if ADAPTIVE_CONCURRENCY else "8"))
+
+# 按 (Primary_id, Section_id) 分组调度，同一 trial section 的样本连续发出，TRIAL_AFFINITY=0 关闭
+DEFAULT_TRIAL_AFFINITY = os.getenv("TRIAL_AFFINITY", "1") != "0"
+
+# Seconds a trial section counts as warm after a request on it finished; provider
+# prompt caches keep a prefix for about five minutes
+SECTION_WARM_SECONDS = float(os.getenv("SECTION_WARM_SECONDS", "300"))
+
+# 内容完全相同的样本只请求一次，结果复制给所有 sample_id，DEDUP_SAMPLES=0 关闭
+DEFAULT_DEDUP_SAMPLES = os.getenv("DEDUP_SAMPLES", "1") != "0"
+
+VALID_PREDICTIONS = ("Entailment", "Contradiction")
+
+# Fields that fully determine a sample's prompt apart from its sample_id
+SAMPLE_FIELDS = ("Type", "Section_id", "Primary_id", "Secondary_id", "Statement")
+
+
+def is_valid_result(result):
+    return isinstance(result, dict) and result.get("Prediction") in VALID_PREDICTIONS and "Error" not in result
+
+
+def error_result(error):
+    """Result recorded for a sample whose request still failed after retries.
+
+    Status "error" keeps it apart from a real NAN (an answer that could not be
+    parsed); is_valid_result rejects it, so a resumed run tries the sample again.
+    """
+    return {"Prediction": "NAN", "Status": "error", "Error": str(error),
+            "Error_Type": type(error).__name__, "HTTP_Status": status_code(error)}
+
+
+def jsonl_path(results_file):
+    return str(Path(results_file).with_suffix('.jsonl'))
+
+
+def load_existing_results(results_file):
+    """Return the results in results_file (and its JSONL log) that already hold a valid prediction."""
+    existing = {}
+    if os.path.exists(results_file):
+        try:
+            with open(results_file, 'r', encoding='utf-8') as f:
+                existing = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Could not read existing results from {results_file}: {e}")
+    existing.update(read_jsonl_results(jsonl_path(results_file)))
+    return {sample_id: result for sample_id, result in existing.items() if is_valid_result(result)}
+
+
+def split_duplicates(samples):
+    """Return (unique samples, {kept sample_id: [duplicate sample_ids]}) by SAMPLE_FIELDS content."""
+    unique = {}
+    duplicates = {}
+    seen = {}
+    for sample_id, sample_data in samples.items():
+        key = tuple(sample_data.get(field) for field in SAMPLE_FIELDS)
+        if key in seen:
+            duplicates.setdefault(seen[key], []).append(sample_id)
+        else:
+            seen[key] = sample_id
+            unique[sample_id] = sample_data
+    return unique, duplicates
+
+
+def trial_section(sample_data):
+    return sample_data.get("Primary_id"), sample_data.get("Section_id")
+
+
+def group_by_trial(samples):
+    """Return the samples as lists of (sample_id, sample_data) sharing (Primary_id, Section_id), in first-seen order."""
+    groups = {}
+    for sample_id, sample_data in samples.items():
+        groups.setdefault(trial_section(sample_data), []).append((sample_id, sample_data))
+    return list(groups.values())
+
+
+class _SampleRun:
+    """Bookkeeping shared by run_samples and arun_samples: resume, dedup, scheduling, logging."""
+
+    def __init__(self, test_data, results_file, ensure_ascii, resume, trial_affinity, dedup):
+        if trial_affinity is None:
+            trial_affinity = DEFAULT_TRIAL_AFFINITY
+        if dedup is None:
+            dedup = DEFAULT_DEDUP_SAMPLES
+        self.test_data = test_data
+        self.results_file = results_file
+        self.ensure_ascii = ensure_ascii
+
+        self.resume = resume
+        self.log_file = jsonl_path(results_file)
+        self.results = load_existing_results(results_file) if resume else {}
+        if not resume and os.path.exists(self.log_file):
+            os.remove(self.log_file)
+        pending = {sample_id: sample_data for sample_id, sample_data in test_data.items() if sample_id not in self.results}
+        if len(pending) < len(test_data):
+            print(f"Resuming from {results_file}: {len(test_data) - len(pending)} samples already done")
+
+        self.duplicates = {}
+        if dedup:
+            pending, self.duplicates = split_duplicates(pending)
+            if self.duplicates:
+                print(f"Deduplicated {sum(len(ids) for ids in self.duplicates.values())} samples with identical content")
+
+        self.total_samples = len(pending)
+        if trial_affinity:
+            groups = group_by_trial(pending)
+            if self.total_samples:
+                print(f"Trial affinity: {self.total_samples} samples over {len(groups)} trial sections "
+                      f"(planned: {(self.total_samples - len(groups)) / self.total_samples:.1%} "
+                      f"to follow a finished request on their section)")
+        else:
+            groups = [[item] for item in pending.items()]
+
+        # 每组的第一个样本先发出，它完成后同组其余样本排到队首
+        self.ready = deque(group[0] for group in groups)
+        self.followers = {group[0][0]: group[1:] for group in groups}
+        self.done = 0
+        self.start_time = time.time()
+        self.writer = JsonlResultWriter(self.log_file)
+
+        # trial section -> when the last request on it finished, to measure what the dispatch order achieved
+        self.section_finished = {}
+        self.dispatched = 0
+        self.warm_dispatches = 0
+
+    def next_sample(self):
+        """Pop the next sample to send, counting it as warm if its section finished within SECTION_WARM_SECONDS."""
+        sample_id, sample_data = self.ready.popleft()
+        finished = self.section_finished.get(trial_section(sample_data))
+        self.dispatched += 1
+        if finished is not None and time.time() - finished <= SECTION_WARM_SECONDS:
+            self.warm_dispatches += 1
+        return sample_id, sample_data
+
+    def complete(self, sample_id, result, sample_time):
+        self.section_finished[trial_section(self.test_data[sample_id])] = time.time()
+        self.ready.extendleft(reversed(self.followers.pop(sample_id, [])))
+        self.done += 1
+        for result_id in [sample_id] + self.duplicates.get(sample_id, []):
+            self.results[result_id] = result
+            self.writer.write(result_id, result)
+
+        print(f"Completed sample {self.done}/{self.total_samples}: {sample_id} "
+              f"({result.get('Prediction')}, {sample_time:.2f} seconds)")
+
+        if self.done % 10 == 0:
+            elapsed_time = time.time() - self.start_time
+            remaining = elapsed_time / self.done * (self.total_samples - self.done)
+            status = concurrency_status()
+            print(f"Estimated Time Remaining: {remaining/60:.2f} minutes"
+                  + (f" (concurrency limit: {status})" if status else ""))
+
+    def finish(self):
+        # Compact the log into the JSON file evaluate.py reads, in the original sample order.
+        # A fresh run (resume=False) replaces results_file instead of merging into it
+        ordered = compact_results(self.log_file, self.results_file, order=self.test_data.keys(),
+                                  ensure_ascii=self.ensure_ascii, merge=self.resume)
+        os.remove(self.log_file)
+
+        failed = sum(1 for result in ordered.values() if result.get("Status") == "error")
+        if failed:
+            print(f"{failed} samples failed after retries (Status: error); run again to retry them")
+        if self.dispatched:
+            print(f"Section reuse: {self.warm_dispatches}/{self.dispatched} samples sent while their trial section "
+                  f"was warm ({self.warm_dispatches / self.dispatched:.1%})")
+        status = concurrency_status()
+        for summary in (corpus_cache_summary(), prompt_cache_summary(), key_pool_summary(),
+                        status and f"Final concurrency limit: {status}"):
+            if summary:
+                print(summary)
+        return ordered
+
+
+def run_samples(test_data, process_sample, results_file, max_workers=None, ensure_ascii=True, resume=True,
+                trial_affinity=None, dedup=None):
+    """Run process_sample(sample_id, sample_data) over test_data with a thread pool.
+
+    process_sample must return the result dict stored under the sample_id.
+    Results are appended to a JSONL log next to results_file as they complete
+    and compacted into results_file, in the original test_data order, at the end.
+    With resume, samples that already have a valid (non-error, non-NAN)
+    prediction in results_file or its log are kept and not dispatched again.
+
+    With trial_affinity, samples about the same (Primary_id, Section_id) are
+    dispatched back to back: the first one of each group goes out alone, and
+    once it finishes the rest of its group is sent ahead of any new group, so
+    they find the trial section warm in the corpus and the provider's prompt cache.
+
+    With dedup, samples whose Type, ids and Statement are identical are
+    processed once and the result is written under every duplicate sample_id.
+    """
+    if max_workers is None:
+        max_workers = DEFAULT_MAX_WORKERS
+    run = _SampleRun(test_data, results_file, ensure_ascii, resume, trial_affinity, dedup)
+
+    def timed_process(sample_id, sample_data):
+        sample_start_time = time.time()
+        result = process_sample(sample_id, sample_data)
+        return result, time.time() - sample_start_time
+
+    print(f"Running {run.total_samples} samples with {max_workers} workers")
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {}
+            while run.ready or futures:
+                while run.ready and len(futures) < max_workers:
+                    sample_id, sample_data = run.next_sample()
+                    futures[executor.submit(timed_process, sample_id, sample_data)] = sample_id
+
+                finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    sample_id = futures.pop(future)
+                    try:
+                        result, sample_time = future.result()
+                    except Exception as e:
+                        print(f"Sample {sample_id} failed: {e}")
+                        result, sample_time = error_result(e), 0.0
+                    run.complete(sample_id, result, sample_time)
+    finally:
+        run.writer.close()
+    return run.finish()
+
+
+async def arun_samples(test_data, aprocess_sample, results_file, max_concurrency=None, ensure_ascii=True,
+                       resume=True, trial_affinity=None, dedup=None):
+    """Async counterpart of run_samples for coroutine process functions.
+
+    aprocess_sample(sample_id, sample_data) is awaited with at most
+    max_concurrency samples in flight on the running event loop; scheduling,
+    resume, dedup and the results files behave exactly as in run_samples.
+    The loop's default executor is sized to max_concurrency so blocking calls
+    handed to threads (achat_completion) are not throttled below the cap.
+    """
+    if max_concurrency is None:
+        max_concurrency = DEFAULT_MAX_WORKERS
+    run = _SampleRun(test_data, results_file, ensure_ascii, resume, trial_affinity, dedup)
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=max_concurrency))
+
+    async def timed_process(sample_id, sample_data):
+        sample_start_time = time.time()
+        result = await aprocess_sample(sample_id, sample_data)
+        return result, time.time() - sample_start_time
+
+    print(f"Running {run.total_samples} samples with up to {max_concurrency} in flight")
+    try:
+        tasks = {}
+        while run.ready or tasks:
+            while run.ready and len(tasks) < max_concurrency:
+                sample_id, sample_data = run.next_sample()
+                tasks[asyncio.create_task(timed_process(sample_id, sample_data))] = sample_id
+
+            finished, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in finished:
+                sample_id = tasks.pop(task)
+                try:
+                    result, sample_time = task.result()
+                except Exception as e:
+                    print(f"Sample {sample_id} failed: {e}")
+                    result, sample_time = error_result(e), 0.0
+                run.complete(sample_id, result, sample_time)
+    finally:
+        run.writer.close()
+    return run.finish()
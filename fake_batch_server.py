@@ -0,0 +1,201 @@
+import re
+import sys
+import json
+import time
+import uuid
+import threading
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# Local stand-in for the OpenAI and Anthropic batch endpoints used by batch_api.py,
+# so the submit/poll/fetch flow can be exercised offline. Point the SDKs at it with
+#   OpenAI(api_key="fake", base_url="http://127.0.0.1:8765/v1")
+#   Anthropic(api_key="fake", base_url="http://127.0.0.1:8765")
+# Every request is answered with the same reply text once the batch has been
+# "processing" for delay seconds.
+
+
+class FakeBatchState:
+    def __init__(self, reply="Entailment", delay=0.0):
+        self.reply = reply
+        self.delay = delay
+        self.files = {}
+        self.batches = {}
+        self.lock = threading.Lock()
+
+
+def _now():
+    return int(time.time())
+
+
+def _openai_output(request, reply):
+    body = request["body"]
+    return {
+        "id": f"batch_req_{uuid.uuid4().hex}",
+        "custom_id": request["custom_id"],
+        "response": {
+            "status_code": 200,
+            "request_id": uuid.uuid4().hex,
+            "body": {
+                "id": f"chatcmpl-{uuid.uuid4().hex}",
+                "object": "chat.completion",
+                "created": _now(),
+                "model": body["model"],
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": reply}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+            },
+        },
+        "error": None,
+    }
+
+
+def _anthropic_output(request, reply):
+    return {
+        "custom_id": request["custom_id"],
+        "result": {
+            "type": "succeeded",
+            "message": {
+                "id": f"msg_{uuid.uuid4().hex}",
+                "type": "message",
+                "role": "assistant",
+                "model": request["params"]["model"],
+                "content": [{"type": "text", "text": reply}],
+                "stop_reason": "end_turn",
+                "stop_sequence": None,
+                "usage": {"input_tokens": 0, "output_tokens": 0},
+            },
+        },
+    }
+
+
+class FakeBatchHandler(BaseHTTPRequestHandler):
+    state = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, payload, status=200, content_type="application/json"):
+        data = payload if isinstance(payload, bytes) else json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _body(self):
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def _base_url(self):
+        return f"http://{self.headers['Host']}"
+
+    def _openai_batch(self, batch):
+        done = time.time() - batch["created"] >= self.state.delay
+        total = len(batch["requests"])
+        if done and batch["output_file_id"] is None:
+            lines = "".join(json.dumps(_openai_output(r, self.state.reply)) + "\n" for r in batch["requests"])
+            batch["output_file_id"] = f"file-{uuid.uuid4().hex}"
+            self.state.files[batch["output_file_id"]] = lines.encode('utf-8')
+        return {
+            "id": batch["id"],
+            "object": "batch",
+            "endpoint": "/v1/chat/completions",
+            "input_file_id": batch["input_file_id"],
+            "completion_window": "24h",
+            "status": "completed" if done else "in_progress",
+            "output_file_id": batch["output_file_id"],
+            "error_file_id": None,
+            "created_at": int(batch["created"]),
+            "request_counts": {"total": total, "completed": total if done else 0, "failed": 0},
+        }
+
+    def _anthropic_batch(self, batch):
+        done = time.time() - batch["created"] >= self.state.delay
+        total = len(batch["requests"])
+        return {
+            "id": batch["id"],
+            "type": "message_batch",
+            "processing_status": "ended" if done else "in_progress",
+            "request_counts": {"processing": 0 if done else total, "succeeded": total if done else 0,
+                               "errored": 0, "canceled": 0, "expired": 0},
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(batch["created"])),
+            "expires_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(batch["created"] + 86400)),
+            "ended_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()) if done else None,
+            "cancel_initiated_at": None,
+            "archived_at": None,
+            "results_url": f"{self._base_url()}/v1/messages/batches/{batch['id']}/results" if done else None,
+        }
+
+    def do_POST(self):
+        state = self.state
+        with state.lock:
+            if self.path == "/v1/files":
+                # multipart/form-data upload with "purpose" and "file" fields
+                raw = b"Content-Type: " + self.headers["Content-Type"].encode() + b"\r\n\r\n" + self._body()
+                parts = {part.get_param("name", header="content-disposition"): part
+                         for part in BytesParser().parsebytes(raw).get_payload()}
+                content = parts["file"].get_payload(decode=True)
+                file_id = f"file-{uuid.uuid4().hex}"
+                state.files[file_id] = content
+                return self._send({"id": file_id, "object": "file", "bytes": len(content), "created_at": _now(),
+                                   "filename": "batch.jsonl", "purpose": "batch", "status": "processed"})
+
+            if self.path == "/v1/batches":
+                params = json.loads(self._body())
+                lines = state.files[params["input_file_id"]].decode('utf-8').splitlines()
+                batch_id = f"batch_{uuid.uuid4().hex}"
+                state.batches[batch_id] = {"id": batch_id, "provider": "openai", "created": time.time(),
+                                           "input_file_id": params["input_file_id"], "output_file_id": None,
+                                           "requests": [json.loads(line) for line in lines if line.strip()]}
+                return self._send(self._openai_batch(state.batches[batch_id]))
+
+            if self.path == "/v1/messages/batches":
+                params = json.loads(self._body())
+                batch_id = f"msgbatch_{uuid.uuid4().hex}"
+                state.batches[batch_id] = {"id": batch_id, "provider": "anthropic", "created": time.time(),
+                                           "requests": params["requests"]}
+                return self._send(self._anthropic_batch(state.batches[batch_id]))
+
+        self._send({"error": {"message": f"unknown endpoint {self.path}"}}, status=404)
+
+    def do_GET(self):
+        state = self.state
+        with state.lock:
+            match = re.fullmatch(r"/v1/files/([\w-]+)/content", self.path)
+            if match and match.group(1) in state.files:
+                return self._send(state.files[match.group(1)], content_type="application/octet-stream")
+
+            match = re.fullmatch(r"/v1/batches/([\w-]+)", self.path)
+            if match and match.group(1) in state.batches:
+                return self._send(self._openai_batch(state.batches[match.group(1)]))
+
+            match = re.fullmatch(r"/v1/messages/batches/([\w-]+)(/results)?", self.path)
+            if match and match.group(1) in state.batches:
+                batch = state.batches[match.group(1)]
+                if match.group(2):
+                    lines = "".join(json.dumps(_anthropic_output(r, state.reply)) + "\n" for r in batch["requests"])
+                    return self._send(lines.encode('utf-8'), content_type="application/binary")
+                return self._send(self._anthropic_batch(batch))
+
+        self._send({"error": {"message": f"unknown endpoint {self.path}"}}, status=404)
+
+
+def start_server(port=8765, reply="Entailment", delay=0.0):
+    """Start the fake batch server in a background thread and return it; call shutdown() to stop."""
+    handler = type("Handler", (FakeBatchHandler,), {"state": FakeBatchState(reply, delay)})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    # Usage: python fake_batch_server.py [port] [reply] [delay seconds]
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8765
+    reply = sys.argv[2] if len(sys.argv) > 2 else "Entailment"
+    delay = float(sys.argv[3]) if len(sys.argv) > 3 else 0.0
+    server = start_server(port, reply, delay)
+    print(f"Fake batch server listening on http://127.0.0.1:{port}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
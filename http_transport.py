@@ -0,0 +1,99 @@
+import os
+import atexit
+import threading
+import importlib.util
+
+
+# 所有 provider 共用一个连接池，大小和超时可在 .env 中修改
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", str(HTTP_MAX_CONNECTIONS)))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "10"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "120"))
+
+# HTTP/2 needs the optional h2 package (pip install h2); without it connections stay on HTTP/1.1
+HTTP2 = os.getenv("HTTP2", "1") != "0" and importlib.util.find_spec("h2") is not None
+
+# HTTP package (httpx or httpx2) -> the shared client built from it
+_http_clients = {}
+_http_client_lock = threading.Lock()
+
+
+def http_package(sdk):
+    """Return the HTTP package the SDK sends through, read from its DefaultHttpxClient, or None.
+
+    openai and anthropic are built on httpx2 from openai 3 / anthropic 1 on and
+    on httpx before that, and groq may lag behind, so the package is taken
+    from each SDK instead of being imported by name.
+    """
+    default_client = getattr(sdk, "DefaultHttpxClient", None)
+    for base in getattr(default_client, "__mro__", ()):
+        if base.__name__ == "Client":
+            return importlib.import_module(base.__module__.split(".")[0])
+    return None
+
+
+def get_http_client(package):
+    """Return the process-wide Client of package (httpx or httpx2), shared by every SDK built on it.
+
+    HTTP_MAX_CONNECTIONS caps open connections across all hosts. Idle ones are
+    kept alive per host, so worker threads reuse warm connections (multiplexed
+    over HTTP/2 when h2 is installed) instead of paying a TLS handshake per
+    request.
+    """
+    with _http_client_lock:
+        if package.__name__ not in _http_clients:
+            from key_pool import record_response
+            client = package.Client(
+                # 每个响应的限额 header 记到发出请求的那个 API key 上
+                event_hooks={"response": [record_response]},
+                http2=HTTP2,
+                timeout=package.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+                limits=package.Limits(max_connections=HTTP_MAX_CONNECTIONS,
+                                      max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+                                      keepalive_expiry=HTTP_KEEPALIVE_EXPIRY),
+            )
+            atexit.register(client.close)
+            _http_clients[package.__name__] = client
+        return _http_clients[package.__name__]
+
+
+def client_options(sdk):
+    """Keyword arguments that put an SDK client on the shared connection pool.
+
+    If the SDK's HTTP package cannot be determined, only the read timeout is
+    passed and the SDK keeps its own default client.
+    """
+    package = http_package(sdk)
+    if package is None:
+        print(f"Could not determine the HTTP client of {sdk.__name__}; using its default connection pool")
+        return {"timeout": HTTP_READ_TIMEOUT}
+    return {"http_client": get_http_client(package),
+            "timeout": package.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT)}
+
+
+def configure_huggingface():
+    """Give huggingface_hub a pooled session sized like the shared client.
+
+    huggingface_hub < 1.0 sends through requests, whose default adapter keeps
+    only 10 connections per host; 1.0 and later use httpx and take the shared
+    httpx client directly.
+    """
+    import huggingface_hub
+    if hasattr(huggingface_hub, "set_client_factory"):
+        import httpx
+        huggingface_hub.set_client_factory(lambda: get_http_client(httpx))
+        return
+
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    def backend_factory():
+        session = requests.Session()
+        # 重试由 retry_policy 负责，这里不再重试
+        adapter = HTTPAdapter(pool_connections=HTTP_MAX_CONNECTIONS, pool_maxsize=HTTP_MAX_CONNECTIONS, max_retries=0)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    huggingface_hub.configure_http_backend(backend_factory=backend_factory)
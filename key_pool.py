@@ -0,0 +1,197 @@
+import os
+import re
+import time
+import threading
+from datetime import datetime
+
+from retry_policy import status_code, retry_after
+
+
+# 某个 key 被 429 限流且服务端没有给出等待时间时，暂停使用它的秒数
+KEY_COOLDOWN = float(os.getenv("KEY_COOLDOWN", "10"))
+
+# Quota headers sent by OpenAI-compatible APIs (OpenAI, Groq) and by Anthropic:
+# (remaining requests, remaining tokens, requests reset, tokens reset)
+QUOTA_HEADERS = (
+    ("x-ratelimit-remaining-requests", "x-ratelimit-remaining-tokens",
+     "x-ratelimit-reset-requests", "x-ratelimit-reset-tokens"),
+    ("anthropic-ratelimit-requests-remaining", "anthropic-ratelimit-tokens-remaining",
+     "anthropic-ratelimit-requests-reset", "anthropic-ratelimit-tokens-reset"),
+)
+
+DURATION_PATTERN = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+def parse_reset(value):
+    """Seconds until a quota reset header value: a duration ("1m30.5s", "250ms") or an RFC 3339 time."""
+    if not value:
+        return None
+    parts = DURATION_PATTERN.findall(value)
+    if parts and "".join(number + unit for number, unit in parts) == value.strip():
+        return sum(float(number) * DURATION_UNITS[unit] for number, unit in parts)
+    try:
+        return max(0.0, datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp() - time.time())
+    except ValueError:
+        return None
+
+
+def _int_header(headers, name):
+    value = headers.get(name)
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def load_keys(provider, key_env):
+    """Return every API key configured for provider, in order, without duplicates.
+
+    Reads key_env itself, numbered variants key_env_2, key_env_3, ... and a
+    comma-separated <PROVIDER>_API_KEYS list. Names match case-insensitively,
+    since os.environ upper-cases them on Windows.
+    """
+    numbered = sorted((int(name[len(key_env) + 1:]), value) for name, value in os.environ.items()
+                      if re.fullmatch(re.escape(key_env) + r"_\d+", name, re.IGNORECASE))
+    keys = [os.getenv(key_env)] + [value for _, value in numbered]
+    keys += os.getenv(f"{provider.upper()}_API_KEYS", "").split(",")
+    unique = []
+    for key in keys:
+        key = (key or "").strip()
+        if key and key not in unique:
+            unique.append(key)
+    return unique
+
+
+class KeyState:
+    """Client and last known quota of one API key."""
+
+    def __init__(self, name, client):
+        self.name = name
+        self.client = client
+        self.in_flight = 0
+        self.requests = 0
+        self.throttled = 0
+        self.remaining_requests = None
+        self.remaining_tokens = None
+        self.cooldown_until = 0.0
+        self.last_used = 0.0
+
+    def update(self, headers):
+        # Rest the key until its quota resets once a remaining counter reaches zero
+        now = time.time()
+        for remaining_requests, remaining_tokens, reset_requests, reset_tokens in QUOTA_HEADERS:
+            requests_left = _int_header(headers, remaining_requests)
+            tokens_left = _int_header(headers, remaining_tokens)
+            if requests_left is None and tokens_left is None:
+                continue
+            self.remaining_requests = requests_left
+            self.remaining_tokens = tokens_left
+            if requests_left == 0:
+                self.cooldown_until = max(self.cooldown_until, now + (parse_reset(headers.get(reset_requests)) or KEY_COOLDOWN))
+            if tokens_left == 0:
+                self.cooldown_until = max(self.cooldown_until, now + (parse_reset(headers.get(reset_tokens)) or KEY_COOLDOWN))
+
+
+# API key -> KeyState, so the shared HTTP client can attribute responses to keys
+_states_by_key = {}
+_pools_lock = threading.Lock()
+
+
+def record_response(response):
+    """httpx response hook: update the quota of the key that sent the request."""
+    request_headers = response.request.headers
+    key = request_headers.get("x-api-key")
+    if key is None:
+        key = request_headers.get("authorization", "").removeprefix("Bearer ").strip()
+    with _pools_lock:
+        state = _states_by_key.get(key)
+        if state is not None:
+            state.update(response.headers)
+
+
+class KeyPool:
+    """Spreads requests for one provider over all of its API keys.
+
+    call(fn) runs fn(client) with the client of the least busy key that is not
+    cooling down. A key is rested when its quota headers report zero remaining
+    requests or tokens, or when it gets a 429; the request then moves to
+    another key at once. Only when every key is resting is the 429 raised, so
+    retry_policy backs off.
+    """
+
+    def __init__(self, provider, keys, create_client):
+        self.provider = provider
+        self.states = [KeyState(f"{provider}#{number}", create_client(key))
+                       for number, key in enumerate(keys or [None], 1)]
+        with _pools_lock:
+            for key, state in zip(keys, self.states):
+                _states_by_key[key] = state
+
+    @property
+    def primary(self):
+        # Client of the first key, for APIs that are not spread over keys (batch_api.py)
+        return self.states[0].client
+
+    def _acquire(self):
+        while True:
+            with _pools_lock:
+                now = time.time()
+                ready = [state for state in self.states if state.cooldown_until <= now]
+                if ready:
+                    state = min(ready, key=lambda s: (s.in_flight, s.last_used))
+                    state.in_flight += 1
+                    state.requests += 1
+                    state.last_used = now
+                    return state
+                wait = min(state.cooldown_until for state in self.states) - now
+            time.sleep(wait)
+
+    def call(self, fn):
+        while True:
+            state = self._acquire()
+            try:
+                return fn(state.client)
+            except Exception as e:
+                if status_code(e) != 429:
+                    raise
+                with _pools_lock:
+                    state.throttled += 1
+                    state.cooldown_until = max(state.cooldown_until, time.time() + (retry_after(e) or KEY_COOLDOWN))
+                    other_ready = any(s.cooldown_until <= time.time() for s in self.states)
+                if not other_ready:
+                    raise
+                print(f"{state.name} throttled, switching key")
+            finally:
+                with _pools_lock:
+                    state.in_flight -= 1
+
+    def summary(self):
+        parts = []
+        for state in self.states:
+            quota = "" if state.remaining_requests is None else f", {state.remaining_requests} requests left"
+            parts.append(f"{state.name}: {state.requests} requests, {state.throttled} throttled{quota}")
+        return f"API keys ({self.provider}): " + "; ".join(parts)
+
+
+_pools = []
+
+
+def create_key_pool(provider, keys, create_client):
+    pool = KeyPool(provider, keys, create_client)
+    with _pools_lock:
+        _pools.append(pool)
+    return pool
+
+
+def call_with_client(client, fn):
+    """Run fn with a concrete SDK client: one picked from a KeyPool, or client itself."""
+    if isinstance(client, KeyPool):
+        return client.call(fn)
+    return fn(client)
+
+
+def key_pool_summary():
+    """Return per-key request counts for pools with more than one key, or None."""
+    lines = [pool.summary() for pool in _pools if len(pool.states) > 1]
+    return "\n".join(lines) if lines else None
@@ -0,0 +1,330 @@
+import os
+import re
+import asyncio
+import json
+import math
+import time
+import threading
+from concurrent.futures import Future
+
+from rate_limiter import get_rate_limiter, estimate_tokens
+from response_cache import ResponseCache, get_response_cache
+from retry_policy import call_with_retries
+from key_pool import call_with_client
+from adaptive_concurrency import run_limited
+
+
+# STREAM_COT=1 让 CoT 脚本用 stream_completion，匹配到最终答案就关闭连接
+STREAM_COT = os.getenv("STREAM_COT") == "1"
+
+# BASE_LOGPROBS=1 让 Base 脚本用 classify_completion，只生成一个 token 并比较两个标签的概率
+BASE_LOGPROBS = os.getenv("BASE_LOGPROBS") == "1"
+
+LABELS = ("Entailment", "Contradiction")
+
+# Stops a CoT stream once the verdict is out; stricter than the extraction regexes in
+# the scripts, so a looser "Final Answer:" line just lets the stream run to the end
+FINAL_ANSWER_PATTERN = r"Final Answer:\W*(Contradiction|Entailment)\b"
+
+# Provider-side prompt cache usage accumulated over the process, see prompt_cache_summary()
+_prompt_cache_stats = {"requests": 0, "prompt_tokens": 0, "cached_tokens": 0, "cache_write_tokens": 0}
+_prompt_cache_lock = threading.Lock()
+
+
+def content_text(content):
+    """Return message content as one string; a list of content blocks is joined in order."""
+    if isinstance(content, str):
+        return content
+    return "".join(block["text"] for block in content)
+
+
+def _usage_tokens(provider, response):
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return None
+    if provider == "anthropic":
+        return usage.input_tokens + usage.output_tokens
+    return getattr(usage, "total_tokens", None)
+
+
+def _output_tokens(provider, response):
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return None
+    return getattr(usage, "output_tokens" if provider == "anthropic" else "completion_tokens", None)
+
+
+def _record_prompt_cache(provider, response):
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return
+    if provider == "anthropic":
+        cached = getattr(usage, "cache_read_input_tokens", None) or 0
+        written = getattr(usage, "cache_creation_input_tokens", None) or 0
+        # input_tokens only counts the uncached part of the prompt
+        prompt = usage.input_tokens + cached + written
+    else:
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached = getattr(details, "cached_tokens", None) or 0
+        written = 0
+        prompt = getattr(usage, "prompt_tokens", None) or 0
+    with _prompt_cache_lock:
+        _prompt_cache_stats["requests"] += 1
+        _prompt_cache_stats["prompt_tokens"] += prompt
+        _prompt_cache_stats["cached_tokens"] += cached
+        _prompt_cache_stats["cache_write_tokens"] += written
+
+
+def prompt_cache_summary():
+    """Return a one-line summary of provider prompt cache hits, or None if nothing was sent."""
+    with _prompt_cache_lock:
+        stats = dict(_prompt_cache_stats)
+    if stats["requests"] == 0:
+        return None
+    ratio = stats["cached_tokens"] / stats["prompt_tokens"] if stats["prompt_tokens"] else 0.0
+    return (f"Prompt cache: {stats['cached_tokens']}/{stats['prompt_tokens']} prompt tokens read from cache "
+            f"({ratio:.1%}) over {stats['requests']} requests, {stats['cache_write_tokens']} tokens written")
+
+
+# Requests currently on the wire, keyed like the response cache; see chat_completion
+_in_flight = {}
+_in_flight_lock = threading.Lock()
+
+
+def _metered_attempt(provider, model, prompt_tokens, max_tokens, send):
+    """Run one attempt of a request under the rate and concurrency limits.
+
+    send() returns (result, used_tokens, output_tokens); the concurrency
+    limiter judges latency per output token. Each attempt reserves its own
+    rate-limit budget, so retries and resends to another API key wait for
+    quota like any new request; a failed attempt keeps its reservation.
+    """
+    limiter = get_rate_limiter(provider, model)
+    reserved = limiter.acquire(prompt_tokens, max_tokens)
+    result, used_tokens, _ = run_limited(provider, model, send)
+    limiter.record(reserved, used_tokens)
+    return result
+
+
+def _send_request(client, provider, model, messages, temperature, max_tokens, **kwargs):
+    prompt_tokens = estimate_tokens("".join(content_text(m["content"]) for m in messages))
+    if provider != "anthropic" and max_tokens is not None:
+        kwargs["max_tokens"] = max_tokens
+
+    def send(client):
+        if provider == "anthropic":
+            response = client.messages.create(
+                model=model,
+                max_tokens=max_tokens or 1024,
+                messages=messages,
+                temperature=temperature,
+                **kwargs
+            )
+        else:
+            response = client.chat.completions.create(
+                model=model,
+                messages=[{**m, "content": content_text(m["content"])} for m in messages],
+                temperature=temperature,
+                **kwargs
+            )
+        return response, _usage_tokens(provider, response), _output_tokens(provider, response)
+
+    # 429/5xx 和连接错误按 retry_policy 退避重试，其他错误直接抛给调用方
+    response = call_with_retries(lambda: call_with_client(
+        client, lambda c: _metered_attempt(provider, model, prompt_tokens, max_tokens, lambda: send(c))))
+    _record_prompt_cache(provider, response)
+    return response
+
+
+def _response_text(provider, response):
+    if provider == "anthropic":
+        return response.content[0].text
+    return response.choices[0].message.content
+
+
+def chat_completion(client, provider, model, messages, temperature=0, max_tokens=None, **kwargs):
+    """Send a chat request through the provider's rate limiter and return the response text.
+
+    provider is one of "groq", "dashscope", "openai", "anthropic" or "huggingface";
+    Anthropic uses the messages API, every other provider the OpenAI-compatible one.
+    Identical requests are answered from the on-disk response cache without
+    touching the network, and an identical request that is already in flight
+    on another thread is waited for instead of being sent a second time.
+    Message content may be a list of text blocks (see prompt_layout.py); it is
+    passed as-is to Anthropic so cache_control markers apply, and joined into a
+    plain string for every other provider.
+    """
+    key = ResponseCache.make_key(provider, model, temperature, messages, max_tokens=max_tokens, **kwargs)
+    return _cached_call(key, lambda: _response_text(
+        provider, _send_request(client, provider, model, messages, temperature, max_tokens, **kwargs)))
+
+
+def _cached_call(key, send):
+    """Return the cached text for key, wait for an identical call in flight, or run send() once."""
+    cache = get_response_cache()
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+    with _in_flight_lock:
+        future = _in_flight.get(key)
+        owner = future is None
+        if owner:
+            future = _in_flight[key] = Future()
+    if not owner:
+        return future.result()
+
+    try:
+        text = send()
+        if cache is not None and text is not None:
+            cache.put(key, text)
+        future.set_result(text)
+        return text
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _in_flight_lock:
+            del _in_flight[key]
+
+
+async def achat_completion(client, provider, model, messages, temperature=0, max_tokens=None, **kwargs):
+    """Awaitable chat_completion for async workflows.
+
+    The rate limiter, response cache and in-flight coalescing are thread-based,
+    so the call runs on the event loop's default executor; concurrency is set by
+    how many coroutines await it at once (see engine.arun_samples).
+    """
+    return await asyncio.to_thread(chat_completion, client, provider, model, messages,
+                                   temperature=temperature, max_tokens=max_tokens, **kwargs)
+
+
+def _stream_request(client, provider, model, messages, stop_pattern, start, temperature, max_tokens, **kwargs):
+    prompt_tokens = estimate_tokens("".join(content_text(m["content"]) for m in messages))
+    text = ""
+    verdict_time = None
+
+    def receive(delta):
+        nonlocal text, verdict_time
+        text += delta
+        match = stop_pattern.search(text)
+        if match:
+            text = text[:match.end()]
+            verdict_time = time.time() - start
+        return match is not None
+
+    def attempt(client):
+        nonlocal text, verdict_time
+        # A retried stream starts over, so drop whatever the failed one delivered
+        text = ""
+        verdict_time = None
+        if provider == "anthropic":
+            with client.messages.stream(
+                model=model,
+                max_tokens=max_tokens or 1024,
+                messages=messages,
+                temperature=temperature,
+                **kwargs
+            ) as stream:
+                for delta in stream.text_stream:
+                    if receive(delta):
+                        break
+        else:
+            stream = client.chat.completions.create(
+                model=model,
+                messages=[{**m, "content": content_text(m["content"])} for m in messages],
+                temperature=temperature,
+                stream=True,
+                **kwargs
+            )
+            try:
+                for chunk in stream:
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if delta and receive(delta):
+                        break
+            finally:
+                # 关闭连接，服务端停止继续生成
+                stream.close()
+        # Streams carry no usage block, so the estimate stands in for the real count
+        return text, prompt_tokens + estimate_tokens(text), estimate_tokens(text)
+
+    if provider != "anthropic" and max_tokens is not None:
+        kwargs["max_tokens"] = max_tokens
+    call_with_retries(lambda: call_with_client(
+        client, lambda c: _metered_attempt(provider, model, prompt_tokens, max_tokens, lambda: attempt(c))))
+    return text, verdict_time
+
+
+def stream_completion(client, provider, model, messages, stop_pattern=FINAL_ANSWER_PATTERN, temperature=0,
+                      max_tokens=None, **kwargs):
+    """Stream a chat completion and close the stream as soon as stop_pattern matches.
+
+    Returns (text, time_to_verdict): the text up to the end of the match, or the
+    whole completion if the pattern never matched, and the seconds from the call
+    to the match (None without a match). Goes through the same rate limiter,
+    response cache and in-flight coalescing as chat_completion.
+    """
+    start = time.time()
+    stop_pattern = re.compile(stop_pattern, re.DOTALL)
+    key = ResponseCache.make_key(provider, model, temperature, messages, max_tokens=max_tokens,
+                                 stream_stop=stop_pattern.pattern, **kwargs)
+    verdict = {}
+
+    def send():
+        text, verdict["time"] = _stream_request(client, provider, model, messages, stop_pattern, start,
+                                                temperature, max_tokens, **kwargs)
+        return text
+
+    text = _cached_call(key, send)
+    if "time" in verdict:
+        return text, verdict["time"]
+    # Answered from the cache or by an identical request in flight
+    return text, (time.time() - start if stop_pattern.search(text) else None)
+
+
+def _label_probabilities(top_logprobs, labels):
+    # 一个标签可能被切成多个 token，首 token 是标签前缀（如 "Ent"、" Contr"）就计入该标签
+    probabilities = dict.fromkeys(labels, 0.0)
+    for candidate in top_logprobs:
+        token = candidate.token.strip().lower()
+        if not token:
+            continue
+        for label in labels:
+            if label.lower().startswith(token):
+                probabilities[label] += math.exp(candidate.logprob)
+    return probabilities
+
+
+def classify_completion(client, provider, model, messages, labels=LABELS, max_tokens=1, top_logprobs=5,
+                        temperature=0, **kwargs):
+    """Classify by comparing the labels' probabilities at the first generated token.
+
+    Works on OpenAI-compatible backends that return logprobs (OpenAI, Groq,
+    DashScope). Returns {"Prediction": label, "P_<label>": ..., "Margin": ...}
+    with the probabilities renormalized over labels and Margin the gap between
+    the top two; Prediction is "NAN" only if no label shows up in the top
+    logprobs at all.
+    """
+    if provider == "anthropic":
+        raise ValueError("Anthropic does not return logprobs")
+    key = ResponseCache.make_key(provider, model, temperature, messages, max_tokens=max_tokens,
+                                 logprobs=True, top_logprobs=top_logprobs, **kwargs)
+
+    def send():
+        response = _send_request(client, provider, model, messages, temperature, max_tokens,
+                                 logprobs=True, top_logprobs=top_logprobs, **kwargs)
+        first_token = response.choices[0].logprobs.content[0]
+        return json.dumps(_label_probabilities(first_token.top_logprobs, labels))
+
+    probabilities = json.loads(_cached_call(key, send))
+    total = sum(probabilities.values())
+    if total == 0:
+        return {"Prediction": "NAN", **{f"P_{label}": 0.0 for label in labels}, "Margin": 0.0}
+
+    ranked = sorted(labels, key=lambda label: probabilities[label], reverse=True)
+    result = {"Prediction": ranked[0]}
+    for label in labels:
+        result[f"P_{label}"] = probabilities[label] / total
+    result["Margin"] = (probabilities[ranked[0]] - probabilities[ranked[1]]) / total
+    return result
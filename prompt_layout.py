@@ -0,0 +1,37 @@
+import os
+import json
+
+from ctr_corpus import get_section_content
+
+
+# PROMPT_LAYOUT=cache 时把固定指令和试验内容放在最前面、statement 放在最后，
+# 让同一个 CTR section 的请求共享同一段前缀，命中 OpenAI/Anthropic 的 prompt cache
+PROMPT_LAYOUT = os.getenv("PROMPT_LAYOUT", "default")
+
+
+def create_cached_prompt(instructions, sample_id, sample_data):
+    """Return the prompt as [cacheable prefix block, per-statement block].
+
+    The prefix holds the instructions and the trial section and is byte-identical
+    for every statement about the same (Primary_id, Secondary_id, Section_id); it
+    carries an Anthropic cache_control marker. chat_completion joins the blocks
+    into one string for OpenAI-compatible providers, which cache prefixes
+    automatically.
+    """
+    trial = {
+        "Section_id": sample_data["Section_id"],
+        "Primary_id": sample_data["Primary_id"],
+    }
+    trial_content = {"Primary_Trial": get_section_content(sample_data["Primary_id"], sample_data["Section_id"])}
+    if sample_data["Type"] == "Comparison":
+        trial["Secondary_id"] = sample_data["Secondary_id"]
+        trial_content["Secondary_Trial"] = get_section_content(sample_data["Secondary_id"], sample_data["Section_id"])
+    trial["Trial_Content"] = trial_content
+
+    prefix = instructions + "\n\nClinical trial report section:\n" + json.dumps(trial, indent=2)
+    statement = {sample_id: {"Type": sample_data["Type"], "Statement": sample_data["Statement"]}}
+    suffix = "\n\nStatement:\n" + json.dumps(statement, indent=2)
+    return [
+        {"type": "text", "text": prefix, "cache_control": {"type": "ephemeral"}},
+        {"type": "text", "text": suffix},
+    ]
@@ -0,0 +1,77 @@
+import threading
+
+from http_transport import HTTP_READ_TIMEOUT, client_options, configure_huggingface
+from key_pool import load_keys, create_key_pool
+from rate_limiter import register_keys
+
+
+DASHSCOPE_BASE_URL = "https://dashscope.aliyuncs.com/compatible-mode/v1"
+
+# Environment variable holding each provider's API key unless a preset names another one
+API_KEY_ENV = {
+    "groq": "groq_api_key",
+    "openai": "OPENAI_API_KEY",
+    "anthropic": "ANTHROPIC_API_KEY",
+    "dashscope": "DASHSCOPE_API_KEY",
+    "huggingface": "HF_API_KEY",
+}
+
+
+# 每个工厂函数在内部 import 对应的 SDK，只有真正用到的 provider 才会被加载。
+# The SDKs share one pooled transport and leave retries to retry_policy (max_retries=0)
+def _groq(api_key):
+    import groq
+    return groq.Groq(api_key=api_key, max_retries=0, **client_options(groq))
+
+
+def _openai(api_key):
+    import openai
+    return openai.OpenAI(api_key=api_key, max_retries=0, **client_options(openai))
+
+
+def _dashscope(api_key):
+    import openai
+    return openai.OpenAI(api_key=api_key, base_url=DASHSCOPE_BASE_URL, max_retries=0, **client_options(openai))
+
+
+def _anthropic(api_key):
+    import anthropic
+    return anthropic.Anthropic(api_key=api_key, max_retries=0, **client_options(anthropic))
+
+
+def _huggingface(api_key):
+    from huggingface_hub import InferenceClient
+    configure_huggingface()
+    return InferenceClient(api_key=api_key, timeout=HTTP_READ_TIMEOUT)
+
+
+PROVIDERS = {
+    "groq": _groq,
+    "openai": _openai,
+    "dashscope": _dashscope,
+    "anthropic": _anthropic,
+    "huggingface": _huggingface,
+}
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(provider, api_key_env=None):
+    """Return the KeyPool for provider, importing its SDK and creating the clients on first use.
+
+    The pool holds one client per key found by key_pool.load_keys (api_key_env,
+    api_key_env_2, ... and <PROVIDER>_API_KEYS). Pools are shared per
+    (provider, api_key_env) across the process, so the two stages of the
+    cascade or several Runners on one backend draw from the same keys.
+    """
+    if provider not in PROVIDERS:
+        raise ValueError(f"Unknown provider: {provider} (expected one of {', '.join(PROVIDERS)})")
+    key_env = api_key_env or API_KEY_ENV[provider]
+    with _clients_lock:
+        if (provider, key_env) not in _clients:
+            keys = load_keys(provider, key_env)
+            _clients[(provider, key_env)] = create_key_pool(provider, keys, PROVIDERS[provider])
+            # 同一 provider 的多个 key 池可能共用部分 key，限额按去重后的 key 数放大
+            register_keys(provider, keys)
+        return _clients[(provider, key_env)]
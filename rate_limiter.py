@@ -0,0 +1,141 @@
+import os
+import re
+import time
+import threading
+
+
+# Default (requests per minute, tokens per minute) for each provider. None means unlimited.
+# Override in .env with e.g. GROQ_RPM=30 or, for a single model, GROQ_LLAMA_3_3_70B_VERSATILE_TPM=6000
+DEFAULT_LIMITS = {
+    "groq": (30, 6000),
+    "dashscope": (1200, 1000000),
+    "openai": (500, 30000),
+    "anthropic": (50, 40000),
+    "huggingface": (60, None),
+}
+
+# Completion budget reserved when the caller does not pass max_tokens
+DEFAULT_COMPLETION_TOKENS = 512
+
+
+class TokenBucket:
+    """Bucket refilled continuously at rate_per_minute, holding at most one minute of budget."""
+
+    def __init__(self, rate_per_minute):
+        self.capacity = float(rate_per_minute)
+        self.tokens = float(rate_per_minute)
+        self.fill_rate = rate_per_minute / 60.0
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def set_rate(self, rate_per_minute):
+        # Keep the current balance; a larger bucket fills up at the new rate
+        with self.lock:
+            self._refill()
+            self.capacity = float(rate_per_minute)
+            self.fill_rate = rate_per_minute / 60.0
+            self.tokens = min(self.tokens, self.capacity)
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.fill_rate)
+        self.updated = now
+
+    def acquire(self, amount=1):
+        # A single request larger than the bucket could never fit, so cap it at a full bucket
+        amount = min(float(amount), self.capacity)
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait = (amount - self.tokens) / self.fill_rate
+            time.sleep(wait)
+
+    def consume(self, amount):
+        # Charge (or refund, when negative) without blocking; the balance may go below zero
+        with self.lock:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens - amount)
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute limits for one provider/model pair.
+
+    rpm and tpm are per API key; the buckets allow key_count times as much.
+    """
+
+    def __init__(self, rpm=None, tpm=None, key_count=1):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.requests = TokenBucket(rpm * key_count) if rpm else None
+        self.tokens = TokenBucket(tpm * key_count) if tpm else None
+
+    def set_key_count(self, key_count):
+        if self.requests:
+            self.requests.set_rate(self.rpm * key_count)
+        if self.tokens:
+            self.tokens.set_rate(self.tpm * key_count)
+
+    def acquire(self, prompt_tokens, max_tokens=None):
+        """Block until a request of this size fits under quota and return the reserved token count."""
+        reserved = prompt_tokens + (max_tokens or DEFAULT_COMPLETION_TOKENS)
+        if self.requests:
+            self.requests.acquire(1)
+        if self.tokens:
+            self.tokens.acquire(reserved)
+        return reserved
+
+    def record(self, reserved, used_tokens):
+        # Settle the reservation against the usage reported by the API
+        if self.tokens and used_tokens is not None:
+            self.tokens.consume(used_tokens - reserved)
+
+
+def estimate_tokens(text):
+    # Rough estimate of ~4 characters per token, good enough for budgeting
+    return len(text) // 4 + 1
+
+
+def _env_limit(provider, model, kind):
+    model_key = re.sub(r'[^A-Za-z0-9]+', '_', f"{provider}_{model}").upper()
+    value = os.getenv(f"{model_key}_{kind}") or os.getenv(f"{provider.upper()}_{kind}")
+    return int(value) if value else None
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+# Distinct API keys in use per provider, over all of its key pools (key_pool.py); quotas are per key
+_provider_keys = {}
+
+
+def _key_count(provider):
+    return max(1, len(_provider_keys.get(provider, ())))
+
+
+def register_keys(provider, keys):
+    """Add the keys of a new key pool to provider's quota and rescale its existing limiters."""
+    with _limiters_lock:
+        _provider_keys.setdefault(provider, set()).update(keys)
+        for (limiter_provider, _), limiter in _limiters.items():
+            if limiter_provider == provider:
+                limiter.set_key_count(_key_count(provider))
+
+
+def get_rate_limiter(provider, model):
+    """Return the limiter shared by every caller of this provider/model in the process.
+
+    The per-key limits are multiplied by the number of distinct keys
+    registered for the provider with register_keys, since key_pool.py spreads
+    the requests over all of them.
+    """
+    key = (provider, model)
+    with _limiters_lock:
+        if key not in _limiters:
+            default_rpm, default_tpm = DEFAULT_LIMITS.get(provider, (None, None))
+            rpm = _env_limit(provider, model, "RPM") or default_rpm
+            tpm = _env_limit(provider, model, "TPM") or default_tpm
+            _limiters[key] = RateLimiter(rpm, tpm, _key_count(provider))
+        return _limiters[key]
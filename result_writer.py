@@ -0,0 +1,101 @@
+import os
+import sys
+import json
+import threading
+
+
+class JsonlResultWriter:
+    """Append-only sink writing one {"sample_id": ..., "result": ...} line per sample.
+
+    Each line is flushed as soon as it is written and the file is fsynced every
+    fsync_every records, so the per-sample cost stays constant and a crash can at
+    worst leave a truncated last line, which read_jsonl_results skips.
+    """
+
+    def __init__(self, path, fsync_every=50):
+        self.path = path
+        self.fsync_every = fsync_every
+        self.pending = 0
+        self.lock = threading.Lock()
+        self.f = open(path, 'a', encoding='utf-8')
+        # Start on a fresh line if a previous run died in the middle of one
+        if self.f.tell() > 0:
+            with open(path, 'rb') as existing:
+                existing.seek(-1, os.SEEK_END)
+                if existing.read(1) != b"\n":
+                    self.f.write("\n")
+
+    def write(self, sample_id, result):
+        line = json.dumps({"sample_id": sample_id, "result": result}, ensure_ascii=False)
+        with self.lock:
+            self.f.write(line + "\n")
+            self.f.flush()
+            self.pending += 1
+            if self.pending >= self.fsync_every:
+                os.fsync(self.f.fileno())
+                self.pending = 0
+
+    def close(self):
+        with self.lock:
+            if not self.f.closed:
+                self.f.flush()
+                os.fsync(self.f.fileno())
+                self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_jsonl_results(path):
+    """Return {sample_id: result} from a JSONL results file; later lines win."""
+    results = {}
+    if not os.path.exists(path):
+        return results
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # Truncated line from an interrupted write
+                continue
+            results[record["sample_id"]] = record["result"]
+    return results
+
+
+def write_json_atomic(results, results_file, ensure_ascii=True):
+    # Write to a temporary file first so an interrupted write never leaves a half-written JSON
+    tmp_file = f"{results_file}.tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=4, ensure_ascii=ensure_ascii)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_file, results_file)
+
+
+def compact_results(jsonl_file, results_file, order=None, ensure_ascii=True, merge=True):
+    """Merge jsonl_file into the {"uuid": {"Prediction": ...}} file evaluate.py expects.
+
+    With merge, entries already in results_file are kept unless the JSONL has a
+    newer result for the same sample; without it results_file is replaced by
+    the JSONL results alone. With order, samples are written in that order first.
+    """
+    results = {}
+    if merge and os.path.exists(results_file):
+        with open(results_file, 'r', encoding='utf-8') as f:
+            results = json.load(f)
+    results.update(read_jsonl_results(jsonl_file))
+    if order is not None:
+        ordered = {sample_id: results[sample_id] for sample_id in order if sample_id in results}
+        ordered.update({sample_id: result for sample_id, result in results.items() if sample_id not in ordered})
+        results = ordered
+    write_json_atomic(results, results_file, ensure_ascii)
+    return results
+
+
+if __name__ == "__main__":
+    # Usage: python result_writer.py predictions.jsonl predictions.json
+    compacted = compact_results(sys.argv[1], sys.argv[2])
+    print(f"Wrote {len(compacted)} results to {sys.argv[2]}")
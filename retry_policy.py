@@ -0,0 +1,83 @@
+import os
+import time
+import random
+from email.utils import parsedate_to_datetime
+
+
+# 每个请求最多尝试的次数（含第一次），以及指数退避的起始/最大等待秒数，可在 .env 中修改
+RETRY_MAX_ATTEMPTS = int(os.getenv("RETRY_MAX_ATTEMPTS", "5"))
+RETRY_BASE_DELAY = float(os.getenv("RETRY_BASE_DELAY", "1"))
+RETRY_MAX_DELAY = float(os.getenv("RETRY_MAX_DELAY", "60"))
+
+# Rate limits, timeouts, overload and transient server errors
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504, 529}
+
+
+def status_code(error):
+    """Return the HTTP status of a provider SDK error (openai, groq, anthropic, huggingface_hub), or None."""
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status
+
+
+def retry_after(error):
+    """Return the server's requested wait in seconds from Retry-After(-ms) headers, or None."""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        # HTTP-date form
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def is_retryable(error):
+    status = status_code(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    # Connection resets and timeouts carry no status; the SDKs name them *ConnectionError / *Timeout*
+    name = type(error).__name__
+    return isinstance(error, (ConnectionError, TimeoutError)) or "Connection" in name or "Timeout" in name
+
+
+def backoff_delay(attempt, error=None):
+    """Seconds to wait before retry number attempt (1-based).
+
+    A Retry-After from the server is honored, plus a little jitter so workers
+    that were throttled together do not all come back at once; otherwise the
+    wait is exponential with full jitter, capped at RETRY_MAX_DELAY.
+    """
+    requested = retry_after(error) if error is not None else None
+    if requested is not None:
+        return min(requested, RETRY_MAX_DELAY) + random.uniform(0, RETRY_BASE_DELAY)
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** (attempt - 1)))
+
+
+def call_with_retries(call, max_attempts=None):
+    """Return call(), retrying retryable errors up to max_attempts; anything else is raised at once."""
+    if max_attempts is None:
+        max_attempts = RETRY_MAX_ATTEMPTS
+    for attempt in range(1, max_attempts + 1):
+        try:
+            return call()
+        except Exception as e:
+            if attempt == max_attempts or not is_retryable(e):
+                raise
+            delay = backoff_delay(attempt, e)
+            print(f"Retrying in {delay:.1f}s (attempt {attempt}/{max_attempts} failed: {e})")
+            time.sleep(delay)
@@ -1,178 +1,8 @@
-import os
-import json
-from openai import OpenAI
-from dotenv import load_dotenv
-from pathlib import Path
-import time
-from datetime import datetime
-import re
-from huggingface_hub import InferenceClient
-from groq import Groq
+from runner import Runner
 
-# 加载环境变量
-load_dotenv()
-
-# 初始化Groq客户端
-client = Groq(
-    api_key=os.getenv("groq_api_key"),  # 确保在.env文件中添加GROQ_API_KEY
-)
-
-def read_json_file(file_path):
-    with open(file_path, 'r', encoding='utf-8') as f:
-        return json.load(f)
-
-def get_section_content(trial_id, section_id):
-    # 构建临床试验文件路径
-    trial_path = Path(r"\CT json") / f"{trial_id}.json"
-    if not trial_path.exists():
-        return None
-    
-    trial_data = read_json_file(trial_path)
-    return trial_data.get(section_id, "")
-
-def create_prompt(sample_id, sample_data):
-    # 获取Primary试验的内容
-    primary_content = get_section_content(sample_data["Primary_id"], sample_data["Section_id"])
-    
-    if sample_data["Type"] == "Comparison":
-        # 获取Secondary试验的内容
-        secondary_content = get_section_content(sample_data["Secondary_id"], sample_data["Section_id"])
-        prompt_template = {
-            sample_id: {
-                "Type": "Comparison",
-                "Trial_Content": {
-                    "Primary_Trial": primary_content,
-                    "Secondary_Trial": secondary_content
-                },
-                "Section_id": sample_data["Section_id"],
-                "Primary_id": sample_data["Primary_id"],
-                "Secondary_id": sample_data["Secondary_id"],
-                "Statement": sample_data["Statement"]
-            }
-        }
-    else:  # Single类型
-        prompt_template = {
-            sample_id: {
-                "Type": "Single",
-                "Trial_Content": {
-                    "Primary_Trial": primary_content
-                },
-                "Section_id": sample_data["Section_id"],
-                "Primary_id": sample_data["Primary_id"],
-                "Statement": sample_data["Statement"]
-            }
-        }
-    
-    # task_prompt = "Task: Determine whether the following statement is logically entailed by the specified section of the clinical trial report (CTR).\n"
-    # task_prompt += json.dumps(prompt_template, indent=2)
-    # task_prompt += "\nIf the statement is true based on the section, return 'Entailment'.\nIf the statement is false, return 'Contradiction'.\nDo not return any text and content other than this. Only return 'Entailment' or 'Contradiction'."
-    
-
-    task_prompt = "Task: Determine whether the following statement is logically entailed by the specified section of the clinical trial report (CTR). Let's approach this step by step:\n\n"
-    task_prompt += json.dumps(prompt_template, indent=2)
-    task_prompt += "\n\nLet's think about this step by step:\n"
-    task_prompt += "1. First, let's identify the key claim made in the statement.\n"
-    task_prompt += "2. Next, let's examine the relevant information provided in the CTR section.\n"
-    task_prompt += "3. Let's compare the statement with the CTR information:\n"
-    task_prompt += "   - What specific evidence supports or contradicts the statement?\n"
-    task_prompt += "   - Are there any important details or conditions mentioned in the CTR that affect our conclusion?\n"
-    task_prompt += "4. Based on this analysis, we can conclude:\n"
-    # task_prompt += "\nFinal Answer: [Your reasoning should lead to either 'Entailment' or 'Contradiction']\nDo not include any other text."
-    task_prompt += "\nFinal Answer: [IMPORTANT: In the Final Answer, your response MUST end with 'Final Answer: ' followed by ONLY 'Entailment' or 'Contradiction'. No other format is acceptable.]"
-    return task_prompt
-
-def get_model_prediction(prompt):
-    try:
-        messages = [
-            {
-                "role": "user",
-                "content": prompt
-            }
-        ]
-        
-        response = client.chat.completions.create(
-            model="llama-3.1-8b-instant",
-            messages=messages,
-            temperature=0
-        )
-        prediction = response.choices[0].message.content.strip()
-        
-        # 打印原始输出
-        print("\n=== Llama-3.1-8b-instant 原始输出 ===")
-        print(prediction)
-        print("=====================\n")
-        
-        # 新的提取逻辑
-        last_line = prediction.strip().split('\n')[-1]
-        words = re.findall(r'\b\w+\b', last_line)
-        
-        if words and words[-1] in ["Entailment", "Contradiction"]:
-            return prediction, words[-1]  # 返回原始输出和提取的结果
-        
-        for word in reversed(words):
-            if word in ["Entailment", "Contradiction"]:
-                return prediction, word
-        
-        return prediction, "NAN"
-        
-    except Exception as e:
-        print(f"API error: {e}")
-        return "API Error", "Contradiction"
-
-def main():
-    # 记录开始时间
-    start_time = time.time()
-    start_datetime = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    print(f"开始处理时间: {start_datetime}")
-
-    # 读取测试文件
-    test_file = r"test.json"
-    test_data = read_json_file(test_file)
-    
-    # 存储结果
-    results = {}
-    
-    # 将字典转换为列表以便按索引访问
-    samples_list = list(test_data.items())
-    
-    # 处理所有样本
-    for i in range(len(samples_list)):
-        sample_id, sample_data = samples_list[i]
-        sample_start_time = time.time()
-        
-        print(f"Processing sample {i + 1}: {sample_id}")
-        prompt = create_prompt(sample_id, sample_data)
-        raw_output, prediction = get_model_prediction(prompt)  # 接收两个返回值
-        results[sample_id] = {
-            "Prediction": prediction,
-            "Model_Output": raw_output  # 保存原始输出
-        }
-        
-        # 计算并显示样本的处理时间
-        sample_time = time.time() - sample_start_time
-        print(f"Sample processing time: {sample_time:.2f} seconds")
-        
-        # 每处理一个样本就保存一次结果
-        with open('predictions_CoT_llama8B_groq.json', 'w', encoding='utf-8') as f:
-            json.dump(results, f, indent=4)
-        
-        print(f"Results saved to predictions_CoT_llama8B_groq.json")
-    
-
-    # 计算总运行时间
-    total_time = time.time() - start_time
-    end_datetime = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    
-    print(f"\nProcessing completed!")
-    print(f"Start time: {start_datetime}")
-    print(f"End time: {end_datetime}")
-    print(f"Total running time: {total_time:.2f} seconds")
-    print(f"Processed samples from 1 to {len(samples_list)}")
+runner = Runner("groq", "llama-3.1-8b-instant", "cot", "predictions_CoT_llama8B_groq.json",
+                extract="last_line", keep_output=True, test_file="test.json")
 
 
 if __name__ == "__main__":
-    main()
-
-
-
-
+    runner.main()
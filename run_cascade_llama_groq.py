@@ -0,0 +1,160 @@
+import os
+import sys
+import time
+import importlib.util
+from datetime import datetime
+from pathlib import Path
+from dotenv import load_dotenv
+
+# 加载环境变量，必须在下面的模块之前：它们在 import 时读取配置
+load_dotenv()
+
+from engine import run_samples, load_existing_results
+from llm_client import classify_completion
+from prompt_layout import create_cached_prompt
+from runner import read_json_file, DEFAULT_TEST_FILE
+
+REPO_DIR = Path(__file__).parent
+EVAL_DIR = REPO_DIR / "Task-2-SemEval-2024-main"
+
+# 8B 结果的 margin 低于这个值就升级到 70B
+CASCADE_MARGIN = float(os.getenv("CASCADE_MARGIN", "0.5"))
+
+# 升级路径：cot 使用 run_4_CoT_llama3.3_groq.py，dual 使用 run_DualAgent_CoT_llama3.3.py
+CASCADE_ESCALATE = os.getenv("CASCADE_ESCALATE", "cot")
+
+# Full-70B predictions the cascade is compared against
+REFERENCE_FILES = {
+    "cot": EVAL_DIR / "res" / "predictions_CoT_llama3.3_groq.json",
+    "dual": EVAL_DIR / "res" / "predictions_DualAgent_CoT_llama3.3_groq.json",
+}
+
+SMALL_MODEL = "llama-3.1-8b-instant"
+
+# 第二个廉价信号：同一个 8B 模型在 statement 放到最后的 prompt 上再判一次，结论随顺序变化就视为不确定
+CHECK_INSTRUCTIONS = (
+    "Task: Determine whether the statement given at the end is logically entailed by the clinical trial report (CTR) section below.\n"
+    "Answer with ONLY ONE word: Entailment or Contradiction."
+)
+
+
+def load_script(filename):
+    # 脚本文件名里带 "."，不能直接 import
+    spec = importlib.util.spec_from_file_location(Path(filename).stem.replace(".", "_"), REPO_DIR / filename)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# 两个阶段直接复用对应脚本里的 Runner preset
+small = load_script("run_base_llama8B_groq.py").runner
+if CASCADE_ESCALATE == "dual":
+    large = load_script("run_DualAgent_CoT_llama3.3.py").runner
+else:
+    large = load_script("run_4_CoT_llama3.3_groq.py").runner
+escalate = large.process_sample
+
+
+def classify_small(prompt):
+    try:
+        return classify_completion(small.client, "groq", SMALL_MODEL, [{"role": "user", "content": prompt}])
+    except Exception as e:
+        print(f"API error: {e}")
+        return {"Prediction": "NAN", "Margin": 0.0}
+
+
+def process_sample(sample_id, sample_data):
+    sample_start_time = time.time()
+
+    # 第一步：8B 单 token 分类，使用 run_base_llama8B_groq.py 的 prompt
+    first = classify_small(small.create_prompt(sample_id, sample_data))
+    second = None
+    if first["Prediction"] == "NAN":
+        reason = "NAN"
+    elif first["Margin"] < CASCADE_MARGIN:
+        reason = "low_margin"
+    else:
+        second = classify_small(create_cached_prompt(CHECK_INSTRUCTIONS, sample_id, sample_data))
+        reason = "disagreement" if second["Prediction"] != first["Prediction"] else None
+
+    result = {
+        "Prediction": first["Prediction"],
+        "Stage": "8B",
+        "Small_Margin": first["Margin"],
+        "Check_Prediction": second["Prediction"] if second else None,
+    }
+
+    # 第二步：不确定时升级到 70B，保留 8B 的结论方便对比
+    if reason is not None:
+        result["Small_Prediction"] = first["Prediction"]
+        result["Prediction"] = escalate(sample_id, sample_data)["Prediction"]
+        result["Stage"] = "70B"
+        result["Escalation_Reason"] = reason
+
+    result["Processing_Time"] = f"{time.time() - sample_start_time:.2f} seconds"
+    return result
+
+
+def compare_with_reference(results, reference_file):
+    """Print the cascade's scores next to the full-70B run's, when gold labels and the reference exist."""
+    gold_file = EVAL_DIR / "ref" / "gold_test.json"
+    if not gold_file.exists() or not Path(reference_file).exists():
+        print(f"Skipping metric comparison: {gold_file} or {reference_file} not found")
+        return
+
+    sys.path.insert(0, str(EVAL_DIR))
+    from evaluate import score
+
+    gold = read_json_file(gold_file)
+    reference = read_json_file(reference_file)
+    # 只比较两边都有的样本，保证差值来自同一批数据
+    common = [sample_id for sample_id in results if sample_id in reference]
+    cascade_scores = score({sample_id: results[sample_id] for sample_id in common}, gold)
+    reference_scores = score({sample_id: reference[sample_id] for sample_id in common}, gold)
+
+    print(f"\nMetrics on {len(common)} samples (cascade vs full 70B {CASCADE_ESCALATE}):")
+    for metric, value in cascade_scores.items():
+        delta = value - reference_scores[metric]
+        print(f"{metric}: {value:.4f} vs {reference_scores[metric]:.4f} ({delta:+.4f})")
+
+
+def main():
+    # 记录开始时间
+    start_time = time.time()
+    start_datetime = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    print(f"开始处理时间: {start_datetime}")
+
+    # 读取测试文件，和其他脚本一样由 .env 的 TEST_FILE 指定
+    test_data = read_json_file(DEFAULT_TEST_FILE)
+
+    output_file = f'predictions_cascade_llama8B_70B_{CASCADE_ESCALATE}.json'
+
+    # 续跑时跳过的样本不计入吞吐量
+    resumed = load_existing_results(output_file)
+    processed_samples = sum(1 for sample_id in test_data if sample_id not in resumed)
+
+    # 并发处理所有样本，每完成一个样本就保存一次结果，防止中断丢失数据
+    results = run_samples(test_data, process_sample, output_file)
+
+    # 计算总运行时间
+    total_time = time.time() - start_time
+    end_datetime = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    escalated = [result for result in results.values() if result.get("Stage") == "70B"]
+    reasons = {}
+    for result in escalated:
+        reasons[result["Escalation_Reason"]] = reasons.get(result["Escalation_Reason"], 0) + 1
+
+    print(f"\nProcessing completed!")
+    print(f"Start time: {start_datetime}")
+    print(f"End time: {end_datetime}")
+    print(f"Total running time: {total_time:.2f} seconds ({total_time/60:.2f} minutes)")
+    print(f"Throughput: {processed_samples/total_time:.2f} samples per second ({processed_samples} processed in this run)")
+    print(f"Escalation rate: {len(escalated)}/{len(results)} ({len(escalated)/max(len(results), 1):.1%}) {reasons}")
+    print(f"Results saved to {output_file}")
+
+    compare_with_reference(results, os.getenv("CASCADE_REFERENCE") or REFERENCE_FILES[CASCADE_ESCALATE])
+
+
+if __name__ == "__main__":
+    main()
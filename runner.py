@@ -0,0 +1,462 @@
+import os
+import re
+import sys
+import json
+import time
+import asyncio
+from datetime import datetime
+from typing import Dict, Any, TypedDict, Optional
+from dotenv import load_dotenv
+
+# 加载环境变量，必须在下面的模块之前：它们在 import 时读取配置
+load_dotenv()
+
+from ctr_corpus import get_section_content
+from engine import run_samples, arun_samples
+from llm_client import (chat_completion, achat_completion, stream_completion, classify_completion,
+                        STREAM_COT, BASE_LOGPROBS, LABELS, FINAL_ANSWER_PATTERN)
+from prompt_layout import PROMPT_LAYOUT, create_cached_prompt
+from batch_api import run_batch
+from providers import PROVIDERS, get_client
+from verifier_gate import SKIP_VERIFIER, PRIMARY_SECONDARY, make_confidence_check, route_after_check
+
+STRATEGIES = ("base", "cot", "dual")
+
+DEFAULT_TEST_FILE = os.getenv("TEST_FILE", r"\test.json")
+
+# Backends that return top_logprobs for BASE_LOGPROBS, and those batch_api.py can submit to
+LOGPROB_PROVIDERS = ("groq", "openai", "dashscope")
+BATCH_PROVIDERS = ("openai", "anthropic")
+
+# deepseek-r1 会在 <think> 里提前写出 "Final Answer:"，只在思考结束后才停止流式输出
+THINK_STOP_PATTERN = r"</think>.*?" + FINAL_ANSWER_PATTERN
+
+# Instructions placed (before, after) the serialized case for each prompt variant
+PROMPTS = {
+    "base": (
+        "Task: Determine whether the following statement is logically entailed by the specified section of the clinical trial report (CTR).\n",
+        "\nYou MUST respond ONLY with either 'Entailment' or 'Contradiction'."
+        "\nIf the statement is true based on the section, return 'Entailment'.\nIf the statement is false, return 'Contradiction'."
+        "\nStrict requirements:\n"
+        "1. Answer with ONLY ONE word: Entailment or Contradiction\n"
+        "2. DO NOT explain your reasoning\n"
+        "3. DO NOT add any other text\n"
+        "4. DO NOT add any punctuation\n"
+        "\nAnswer:\n",
+    ),
+    "base_short": (
+        "Task: Determine whether the following statement is logically entailed by the specified section of the clinical trial report (CTR).\n",
+        "\nIf the statement is true based on the section, return 'Entailment'.\nIf the statement is false, return 'Contradiction'.\nDo not return any text and content other than this. Only return 'Entailment' or 'Contradiction'.",
+    ),
+    "base_deepseek": (
+        "You are DeepSeek R1, an advanced medical reasoning model. \nCarefully read the following section from the clinical trial report (CTR) and analyze the statement. \nTask:Determine whether the statement is logically entailed or contradicted by the CTR.\n ",
+        "\nYou MUST respond ONLY with either 'Entailment' or 'Contradiction'."
+        "\nIf the statement is true based on the section, return 'Entailment'.\nIf the statement is false, return 'Contradiction'."
+        "\nRequirements:\n"
+        "1. Answer with ONLY ONE word: Entailment or Contradiction\n"
+        "2. DO NOT add any other text and punctuation\n"
+        "\n\nAnswer:\n",
+    ),
+}
+
+COT_HEADER = "Task: Determine whether the following statement is logically entailed by the specified section of the clinical trial report (CTR). Let's approach this step by step:\n\n"
+COT_STEPS = (
+    "\n\nLet's think about this step by step:\n"
+    "1. First, let's identify the key claim made in the statement.\n"
+    "2. Next, let's examine the relevant information provided in the CTR section.\n"
+    "3. Let's compare the statement with the CTR information:\n"
+    "   - What specific evidence supports or contradicts the statement?\n"
+    "   - Are there any important details or conditions mentioned in the CTR that affect our conclusion?\n"
+    "4. Based on this analysis, we can conclude:\n"
+)
+PROMPTS["cot"] = (COT_HEADER, COT_STEPS + "\nFinal Answer: [IMPORTANT: In the Final Answer, your response MUST end with 'Final Answer: ' followed by ONLY 'Entailment' or 'Contradiction'. No other format is acceptable.]")
+PROMPTS["cot_deepseek"] = (COT_HEADER, COT_STEPS + "\nFinal Answer: [IMPORTANT: In the Final Answer, your response MUST end with 'Final Answer: ' followed by ONLY 'Entailment' or 'Contradiction'.]")
+PROMPTS["cot_label"] = (COT_HEADER, COT_STEPS + "\nFinal Answer: [Your reasoning should lead to either 'Entailment' or 'Contradiction']\nDo not include any other text.")
+
+# PROMPT_LAYOUT=cache 使用的指令：固定部分在前，试验内容和 statement 由 create_cached_prompt 依次接在后面
+CACHED_PROMPTS = {
+    "base_short": (
+        "Task: Determine whether the statement given at the end is logically entailed by the clinical trial report (CTR) section below.\n"
+        "If the statement is true based on the section, return 'Entailment'.\nIf the statement is false, return 'Contradiction'.\n"
+        "Do not return any text and content other than this. Only return 'Entailment' or 'Contradiction'."
+    ),
+    "cot": (
+        "Task: Determine whether the statement given at the end is logically entailed by the clinical trial report (CTR) section below."
+        + COT_STEPS
+        + "\nFinal Answer: [IMPORTANT: In the Final Answer, your response MUST end with 'Final Answer: ' followed by ONLY 'Entailment' or 'Contradiction'. No other format is acceptable.]"
+    ),
+}
+
+REASONING_PROMPT = """Task: As the primary reviewer, analyze whether the given statement is logically entailed by the clinical trial report (CTR) section. Please:
+1. Carefully examine the evidence from the trial content
+2. Provide a step-by-step reasoning process
+3. Draw a conclusion (Entailment/Contradiction)
+4. Explain your rationale
+Input:
+"""
+
+VERIFICATION_PROMPT = (
+    "Task: As the secondary reviewer, verify the reasoning and conclusion provided by the primary reviewer. Please:\n"
+    "5. Review the original evidence and statement\n"
+    "6. Analyze the primary reviewer's reasoning process\n"
+    "7. Identify any logical flaws or inconsistencies or \n"
+    "8. Confirm or challenge the conclusion\n"
+    "9. Provide your final judgment\n"
+    "Original Case:\n"
+)
+
+
+def read_json_file(file_path):
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def create_case_prompt(sample_id, sample_data):
+    """Serialize one sample and its trial section(s) as the JSON block every prompt embeds."""
+    # 获取Primary试验的内容
+    primary_content = get_section_content(sample_data["Primary_id"], sample_data["Section_id"])
+
+    if sample_data["Type"] == "Comparison":
+        # 获取Secondary试验的内容
+        secondary_content = get_section_content(sample_data["Secondary_id"], sample_data["Section_id"])
+        prompt_template = {
+            sample_id: {
+                "Type": "Comparison",
+                "Trial_Content": {
+                    "Primary_Trial": primary_content,
+                    "Secondary_Trial": secondary_content
+                },
+                "Section_id": sample_data["Section_id"],
+                "Primary_id": sample_data["Primary_id"],
+                "Secondary_id": sample_data["Secondary_id"],
+                "Statement": sample_data["Statement"]
+            }
+        }
+    else:  # Single类型
+        prompt_template = {
+            sample_id: {
+                "Type": "Single",
+                "Trial_Content": {
+                    "Primary_Trial": primary_content
+                },
+                "Section_id": sample_data["Section_id"],
+                "Primary_id": sample_data["Primary_id"],
+                "Statement": sample_data["Statement"]
+            }
+        }
+    return json.dumps(prompt_template, indent=2)
+
+
+def extract_label(prediction):
+    # 确保结果是 Entailment 或 Contradiction
+    if prediction not in LABELS:
+        return "NAN"
+    return prediction
+
+
+def extract_last_word(prediction):
+    # 从最后一句话中提取最后一个词，清理特殊符号（如Markdown加粗符号**，反引号`等）
+    last_sentence = prediction.split('\n')[-1].strip()
+    cleaned_sentence = re.sub(r'[*`_\[\](){}]', '', last_sentence)
+    words = [word.strip() for word in cleaned_sentence.split() if word.strip()]
+    return extract_label(words[-1] if words else "NAN")
+
+
+def extract_final_answer(prediction):
+    # 使用正则表达式提取 Final Answer 后的结果
+    match = re.search(r"Final Answer:.*?(Contradiction|Entailment)", prediction, re.DOTALL)
+    if match:
+        return match.group(1)
+    return "NAN"
+
+
+def extract_last_line(prediction):
+    # 取最后一行里最后出现的标签
+    last_line = prediction.strip().split('\n')[-1]
+    for word in reversed(re.findall(r'\b\w+\b', last_line)):
+        if word in LABELS:
+            return word
+    return "NAN"
+
+
+def extract_final_judgment(verification):
+    match = re.search(r"Final Judgment:.*?(Contradiction|Entailment)", verification, re.DOTALL)
+    if match:
+        return match.group(1)
+    return "NAN"
+
+
+def extract_judgment_last_line(verification):
+    # 在最后一个非空行中查找关键词
+    lines = [line.strip() for line in verification.split('\n') if line.strip()]
+    if not lines:
+        return "NAN"
+    if "Entailment" in lines[-1]:
+        return "Entailment"
+    if "Contradiction" in lines[-1]:
+        return "Contradiction"
+    return "NAN"
+
+
+EXTRACTORS = {
+    "label": extract_label,
+    "last_word": extract_last_word,
+    "final_answer": extract_final_answer,
+    "last_line": extract_last_line,
+    "final_judgment": extract_final_judgment,
+    "judgment_last_line": extract_judgment_last_line,
+}
+
+# Prompt and extractor a strategy uses when the preset does not choose its own
+STRATEGY_DEFAULTS = {
+    "base": ("base", "label"),
+    "cot": ("cot", "final_answer"),
+    "dual": (None, "final_judgment"),
+}
+
+
+class WorkflowState(TypedDict):
+    sample_id: str
+    sample_data: dict
+    base_prompt: str  # serialized case, built once and shared by both reviewers
+    primary_analysis: Optional[str]
+    final_verification: Optional[str]
+    final_prediction: Optional[str]
+    primary_conclusion: Optional[str]
+    check_prediction: Optional[str]
+    check_margin: Optional[float]
+    path: Optional[str]  # primary_only / primary_secondary
+
+
+class Runner:
+    """One provider/model/strategy combination run over a test file.
+
+    strategy is "base" (answer with a bare label), "cot" (4-step chain of
+    thought ending in "Final Answer:") or "dual" (primary and secondary
+    reviewer LangGraph workflow). prompt and extract pick the instruction
+    variant in PROMPTS and the parser in EXTRACTORS; the remaining options
+    carry the per-model quirks of the original scripts. Every strategy runs
+    through engine.run_samples / arun_samples, so resume, trial-affinity
+    scheduling, dedup and the results log are shared.
+    """
+
+    def __init__(self, provider, model, strategy, output_file, prompt=None, extract=None, api_key_env=None,
+                 max_tokens=None, request_kwargs=None, stop_pattern=FINAL_ANSWER_PATTERN, check_model=None,
+                 keep_output=False, test_file=None):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown strategy: {strategy} (expected one of {', '.join(STRATEGIES)})")
+        if provider not in PROVIDERS:
+            raise ValueError(f"Unknown provider: {provider} (expected one of {', '.join(PROVIDERS)})")
+        default_prompt, default_extract = STRATEGY_DEFAULTS[strategy]
+        self.provider = provider
+        self.model = model
+        self.strategy = strategy
+        self.output_file = output_file
+        self.prompt = prompt or default_prompt
+        self.extract_prediction = EXTRACTORS[extract or default_extract]
+        self.max_tokens = max_tokens
+        self.request_kwargs = request_kwargs or {}
+        self.stop_pattern = stop_pattern
+        self.check_model = check_model or model
+        self.keep_output = keep_output
+        self.test_file = test_file or DEFAULT_TEST_FILE
+        self.api_key_env = api_key_env
+        self._workflow = None
+
+        # 单 token 分类需要 logprobs；deepseek-r1 先输出 <think>，不适用
+        self.logprobs = (strategy == "base" and provider in LOGPROB_PROVIDERS and self.prompt != "base_deepseek")
+        # 只要求输出标签的 CoT prompt 没有 "Final Answer:" 行，不走流式
+        self.stream = strategy == "cot" and self.prompt != "cot_label"
+
+    @property
+    def client(self):
+        # SDK 在第一次请求时才 import 并创建客户端
+        return get_client(self.provider, self.api_key_env)
+
+    def create_prompt(self, sample_id, sample_data):
+        if PROMPT_LAYOUT == "cache" and self.prompt in CACHED_PROMPTS:
+            return create_cached_prompt(CACHED_PROMPTS[self.prompt], sample_id, sample_data)
+        header, footer = PROMPTS[self.prompt]
+        return header + create_case_prompt(sample_id, sample_data) + footer
+
+    def _report_error(self, e):
+        print(f"API error: {e}")
+        if self.provider == "dashscope" and "Arrearage" in str(e):
+            # 阿里云账户欠费，后面的请求也都会失败
+            sys.exit(1)
+
+    def get_model_prediction(self, prompt, timings=None):
+        try:
+            messages = [{"role": "user", "content": prompt}]
+            if self.stream and STREAM_COT:
+                output, timings["Time_To_Verdict"] = stream_completion(
+                    self.client, self.provider, self.model, messages, self.stop_pattern,
+                    max_tokens=self.max_tokens, **self.request_kwargs)
+            else:
+                output = chat_completion(self.client, self.provider, self.model, messages,
+                                         max_tokens=self.max_tokens, **self.request_kwargs)
+            output = output.strip()
+
+            print(f"\n=== {self.model} 原始输出 ===")
+            print(output)
+            print("=====================\n")
+
+            return output, self.extract_prediction(output)
+        except Exception as e:
+            self._report_error(e)
+            raise
+
+    def process_sample(self, sample_id, sample_data):
+        if self.strategy == "dual":
+            # 同步入口，供 run_cascade_llama_groq.py 等线程池调用
+            return asyncio.run(self.aprocess_sample(sample_id, sample_data))
+
+        # 记录每个样本的处理开始时间
+        sample_start_time = time.time()
+        prompt = self.create_prompt(sample_id, sample_data)
+        timings = {}
+
+        if self.logprobs and BASE_LOGPROBS:
+            # 只生成一个 token，直接比较 Entailment / Contradiction 的概率并保存 margin
+            result = classify_completion(self.client, self.provider, self.model, [{"role": "user", "content": prompt}])
+        else:
+            output, prediction = self.get_model_prediction(prompt, timings)
+            result = {"Prediction": prediction}
+            if self.keep_output:
+                result["Model_Output"] = output
+
+        if self.strategy == "base":
+            result["Processing_Time"] = f"{time.time() - sample_start_time:.2f} seconds"
+        elif self.stream and STREAM_COT:
+            # 流式模式下分别记录得到答案的时间和整个请求的时间
+            result["Time_To_Verdict"] = timings.get("Time_To_Verdict")
+            result["Total_Latency"] = time.time() - sample_start_time
+        return result
+
+    async def _review(self, prompt):
+        try:
+            messages = [{"role": "user", "content": prompt}]
+            return (await achat_completion(self.client, self.provider, self.model, messages,
+                                           max_tokens=self.max_tokens, **self.request_kwargs)).strip()
+        except Exception as e:
+            self._report_error(e)
+            raise
+
+    async def primary_reviewer(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        prompt = REASONING_PROMPT + state["base_prompt"]
+        prompt += "\n\nProvide your analysis in the following format:\nReasoning Process:\n[Your step-by-step analysis]\n\nConclusion:\n[Entailment/Contradiction]\n\nRationale:\n[Your explanation]"
+        state["primary_analysis"] = await self._review(prompt)
+        return state
+
+    async def secondary_reviewer(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        prompt = VERIFICATION_PROMPT + state["base_prompt"]
+        prompt += "\n\nPrimary Reviewer's Analysis:\n"
+        prompt += state["primary_analysis"]
+        prompt += "\n\nProvide your verification in the following format:\nVerification Analysis:\n[Your analysis of the primary review]\n\nIdentified Issues (if any):\n[List any logical flaws or inconsistencies]\n\nJustification:\n[Your explanation]\n\nFinal Judgment:\n[MUST output ONLY 'Entailment' or 'Contradiction']"
+        state["final_verification"] = await self._review(prompt)
+        return state
+
+    def final_extractor(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        if state["final_verification"] is None:
+            # secondary review 被跳过时直接采用主审结论
+            state["final_prediction"] = state["primary_conclusion"]
+        else:
+            state["final_prediction"] = self.extract_prediction(state["final_verification"])
+        return state
+
+    def create_workflow(self):
+        from langgraph.graph import StateGraph
+
+        # 创建工作流
+        workflow = StateGraph(WorkflowState)
+
+        workflow.add_node("primary_review", self.primary_reviewer)
+        workflow.add_node("secondary_review", self.secondary_reviewer)
+        workflow.add_node("final_extraction", self.final_extractor)
+
+        workflow.set_entry_point("primary_review")
+        if SKIP_VERIFIER:
+            # 主审结论可信时跳过 secondary reviewer
+            workflow.add_node("confidence_check", make_confidence_check(self.client, self.provider, self.check_model))
+            workflow.add_edge("primary_review", "confidence_check")
+            workflow.add_conditional_edges("confidence_check", route_after_check, {
+                "secondary_review": "secondary_review",
+                "final_extraction": "final_extraction"
+            })
+        else:
+            workflow.add_edge("primary_review", "secondary_review")
+        workflow.add_edge("secondary_review", "final_extraction")
+        workflow.set_finish_point("final_extraction")
+
+        return workflow.compile()
+
+    @property
+    def workflow(self):
+        # The compiled graph is shared by all concurrent samples
+        if self._workflow is None:
+            self._workflow = self.create_workflow()
+        return self._workflow
+
+    async def aprocess_sample(self, sample_id, sample_data):
+        state = {
+            "sample_id": sample_id,
+            "sample_data": sample_data,
+            "base_prompt": create_case_prompt(sample_id, sample_data),
+            "primary_analysis": None,
+            "final_verification": None,
+            "final_prediction": None,
+            "primary_conclusion": None,
+            "check_prediction": None,
+            "check_margin": None,
+            "path": None
+        }
+
+        final_state = await self.workflow.ainvoke(state)
+        return {
+            "Prediction": final_state["final_prediction"],
+            "Primary_Analysis": final_state["primary_analysis"],
+            "Verification": final_state["final_verification"],
+            "Path": final_state["path"] or PRIMARY_SECONDARY,
+            "Check_Margin": final_state["check_margin"]
+        }
+
+    def main(self):
+        # 记录开始时间
+        start_time = time.time()
+        start_datetime = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        print(f"开始处理时间: {start_datetime}")
+        print(f"{self.provider} / {self.model} / {self.strategy} -> {self.output_file}")
+
+        test_data = read_json_file(self.test_file)
+        total_samples = len(test_data)
+
+        # 已有有效结果的样本会自动跳过，中断后直接重新运行即可
+        if os.getenv("BATCH_MODE") == "1" and self.strategy != "dual" and self.provider in BATCH_PROVIDERS:
+            # 通过 Batch API 一次性提交所有样本，完成后再按 sample_id 写回结果
+            run_batch(self.client.primary, self.provider, self.model, test_data, self.create_prompt,
+                      self.extract_prediction, self.output_file, max_tokens=self.max_tokens,
+                      keep_output=self.keep_output, **self.request_kwargs)
+        elif self.strategy == "dual":
+            # reviewer 节点是 async 的，所有样本在同一个 event loop 上并发
+            asyncio.run(arun_samples(test_data, self.aprocess_sample, self.output_file, ensure_ascii=False))
+        else:
+            run_samples(test_data, self.process_sample, self.output_file)
+
+        # 计算总运行时间
+        total_time = time.time() - start_time
+        end_datetime = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+        print(f"\nProcessing completed!")
+        print(f"Start time: {start_datetime}")
+        print(f"End time: {end_datetime}")
+        print(f"Total running time: {total_time:.2f} seconds ({total_time/60:.2f} minutes)")
+        print(f"Average processing time per sample: {total_time/total_samples:.2f} seconds")
+        print(f"Results saved to {self.output_file}")
+
+
+if __name__ == "__main__":
+    # Usage: python runner.py <provider> <model> <base|cot|dual> <output file> [test file]
+    if len(sys.argv) < 5:
+        print("Usage: python runner.py <provider> <model> <base|cot|dual> <output file> [test file]")
+        sys.exit(1)
+    Runner(*sys.argv[1:5], test_file=sys.argv[5] if len(sys.argv) > 5 else None).main()
@@ -0,0 +1,65 @@
+import os
+import re
+
+from llm_client import classify_completion
+
+
+# SKIP_VERIFIER=1 时，主审结论足够可信就跳过 secondary reviewer，直接进入 final_extraction
+SKIP_VERIFIER = os.getenv("SKIP_VERIFIER") == "1"
+
+# Minimum logprob margin of the cheap check before the primary verdict is trusted alone
+VERIFIER_SKIP_MARGIN = float(os.getenv("VERIFIER_SKIP_MARGIN", "0.8"))
+
+CONCLUSION_PATTERN = r"Conclusion:\W*(Contradiction|Entailment)\b"
+
+PRIMARY_ONLY = "primary_only"
+PRIMARY_SECONDARY = "primary_secondary"
+
+
+def parse_conclusion(primary_analysis):
+    """Return the label in the primary reviewer's "Conclusion:" section, or None."""
+    match = re.search(CONCLUSION_PATTERN, primary_analysis or "", re.DOTALL)
+    return match.group(1) if match else None
+
+
+def create_check_prompt(base_prompt):
+    task_prompt = "Task: Determine whether the following statement is logically entailed by the specified section of the clinical trial report (CTR).\n"
+    task_prompt += base_prompt
+    task_prompt += "\nAnswer with ONLY ONE word: Entailment or Contradiction.\n\nAnswer:\n"
+    return task_prompt
+
+
+def make_confidence_check(client, provider, model):
+    """Return a workflow node that decides whether the secondary review can be skipped.
+
+    The primary verdict counts as confident when its Conclusion parses and a
+    one-token logprob classification of the same case (classify_completion on
+    provider/model) agrees with it by at least VERIFIER_SKIP_MARGIN. The node
+    records the conclusion, the check's prediction and margin, and the path.
+    """
+    def confidence_check(state):
+        conclusion = parse_conclusion(state["primary_analysis"])
+        state["primary_conclusion"] = conclusion
+        state["path"] = PRIMARY_SECONDARY
+        if conclusion is None:
+            return state
+
+        try:
+            check = classify_completion(client, provider, model,
+                                        [{"role": "user", "content": create_check_prompt(state["base_prompt"])}])
+        except Exception as e:
+            print(f"Confidence check failed: {e}")
+            return state
+
+        state["check_prediction"] = check["Prediction"]
+        state["check_margin"] = check["Margin"]
+        if check["Prediction"] == conclusion and check["Margin"] >= VERIFIER_SKIP_MARGIN:
+            state["path"] = PRIMARY_ONLY
+        return state
+
+    return confidence_check
+
+
+def route_after_check(state):
+    """Conditional edge target after confidence_check."""
+    return "final_extraction" if state["path"] == PRIMARY_ONLY else "secondary_review"